@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Võrdle kaartide parsimise režiime ("full" = terve leht BeautifulSoupi,
+"cards" = lxml + ainult kaartide alampuud) salvestatud lehtedel.
+
+    python bench/parse_modes.py                          # bench/corpus/<pood>/listing/*.html
+    python bench/parse_modes.py --run last               # silumisarhiivi jooksu lehed
+    python bench/parse_modes.py euronics=leht.html 1a=teine.html --repeat 5
+"""
+
+import argparse, contextlib, io, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import main  # noqa: E402
+from parsers import RUN_LABELS  # noqa: E402  (bench/ on skripti kaustana sys.path-is)
+
+PARSERS = {
+    "euronics": lambda html, mode: main.parse_euronics_cards(html, "bench", dump=False, mode=mode),
+    "1a": lambda html, mode: main.parse_1a_cards(html, dump=False, mode=mode),
+    "kaup24": lambda html, mode: main.parse_kaup24_cards(html, dump=False, mode=mode),
+}
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+
+def corpus_pages() -> list[tuple[str, str, str]]:
+    """[(pood, nimi, html)] korpuse otsingulehtedest."""
+    return [(store, p.name, p.read_text(encoding="utf-8", errors="ignore"))
+            for store in PARSERS for p in sorted((CORPUS_DIR / store / "listing").glob("*.html"))]
+
+def run_pages(run_id: str) -> list[tuple[str, str, str]]:
+    """[(pood, silt, html)] silumisarhiivi jooksust (vt --debug-artifacts)."""
+    return [(RUN_LABELS[a["label"]], a["label"], main.DEBUG.read(a["sha"]))
+            for a in main.DEBUG.artifacts_for(run_id) if a["label"] in RUN_LABELS]
+
+def file_pages(specs: list[str]) -> list[tuple[str, str, str]]:
+    out = []
+    for spec in specs:
+        store, path = spec.split("=", 1)
+        if not Path(path).exists():
+            print(f"{store:<10}  (puudub: {path})")
+            continue
+        out.append((store, path, Path(path).read_text(encoding="utf-8", errors="ignore")))
+    return out
+
+def time_mode(store: str, html: str, mode: str, repeat: int):
+    best, rows = None, None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            rows = PARSERS[store](html, mode)
+            dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, rows
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Kaartide parsimise režiimide võrdlus")
+    ap.add_argument("pages", nargs="*", help="pood=fail.html (vaikimisi bench/corpus otsingulehed)")
+    ap.add_argument("--run", metavar="RUN_ID", help="võta lehed silumisarhiivi jooksust ('last' = viimane)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    if args.pages:
+        pages = file_pages(args.pages)
+    elif args.run:
+        pages = run_pages(args.run)
+    else:
+        pages = corpus_pages()
+    if not pages:
+        print("Lehti ei leitud.")
+        return 1
+    ok = True
+    print(f"{'pood':<10}{'KiB':>8}{'full ms':>10}{'cards ms':>10}{'kiirendus':>11}  read  leht")
+    for store, label, html in pages:
+        t_full, rows_full = time_mode(store, html, "full", args.repeat)
+        t_cards, rows_cards = time_mode(store, html, "cards", args.repeat)
+        same = rows_full == rows_cards
+        ok &= same
+        print(f"{store:<10}{len(html) / 1024:>8.0f}{t_full * 1000:>10.1f}{t_cards * 1000:>10.1f}"
+              f"{t_full / max(t_cards, 1e-9):>10.1f}x  {len(rows_cards)} {'OK' if same else 'ERINEVAD!'}  {label}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+Parserite võrdlusmõõtmine salvestatud lehtedel (korpus) + kuldsed tulemused.
+
+Korpus: <korpus>/<pood>/listing/*.html|*.json ja <korpus>/<pood>/pdp/*.html,
+kuldsed väljundid <korpus>/golden.json. Repos on väike käsitsi tehtud korpus
+(synthetic-*: kõigi poodide kaardid, Klicku JSON, PDP reitingud) koos kullaga –
+see kontrollib parserite tulemusi, aga 2 KiB lehtedel pole aeg ega mälu midagi
+väärt (päris otsingulehed on 0.5–2 MB). Mõõtmiseks kogu päris lehed:
+
+    python bench/parsers.py capture klick "dualsense valge"   # kogujaga, päris võrgust
+    python bench/parsers.py capture 1a "dualsense" --pdp 5    # + 5 tootelehte
+    python bench/parsers.py import-run last                   # out/debug arhiivist
+
+Mõõtmine (iga plokk eraldi: aeg, lehed/s, kaardid/s, mälu, võrdlus kullaga). Mälu on
+ploki RSS-tipu kasv eraldi alamprotsessis (Linuxil VmHWM pärast clear_refs nullimist,
+mujal ru_maxrss) – see näeb ka libxml2 eraldusi, mida tracemalloc ei näe:
+
+    python bench/parsers.py run
+    python bench/parsers.py run --update-golden              # pärast teadlikku muudatust
+"""
+
+import argparse, contextlib, gc, hashlib, io, json, os, resource, subprocess, sys, tempfile, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import main  # noqa: E402
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+STORES = ("euronics", "klick", "1a", "kaup24")
+
+# ----------------------------------
+# KORPUS
+# ----------------------------------
+
+def load_corpus(root: Path) -> dict[str, list[tuple[str, str, str]]]:
+    """{"listing"|"pdp": [(pood, suhteline tee, sisu), ...]}"""
+    out = {"listing": [], "pdp": []}
+    for store in STORES:
+        for kind in out:
+            for p in sorted((root / store / kind).glob("*.*")):
+                out[kind].append((store, p.relative_to(root).as_posix(),
+                                  p.read_text(encoding="utf-8", errors="ignore")))
+    return out
+
+def save_page(root: Path, store: str, kind: str, text: str, ext: str = "html") -> Path:
+    sha = hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()[:12]
+    path = root / store / kind / f"{time.strftime('%Y%m%d')}-{sha}.{ext}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+def capture(args) -> int:
+    """Käivita päris koguja; salvesta iga 200 vastus/brauserileht ja soovi korral PDP-d."""
+    root, store = Path(args.corpus), args.store
+    saved, recording = [], True
+    orig_get, orig_page = main.http_get, main.BROWSER.page_html
+
+    def http_get(url, **kw):
+        r = orig_get(url, **kw)
+        if recording and r.status_code == 200:
+            ext = "json" if "json" in r.headers.get("Content-Type", "") else "html"
+            saved.append(save_page(root, store, "listing", r.text, ext))
+        return r
+
+    def page_html(url, *a, **kw):
+        html = orig_page(url, *a, **kw)
+        if recording:
+            saved.append(save_page(root, store, "listing", html))
+        return html
+
+    main.http_get, main.BROWSER.page_html = http_get, page_html
+    main.HTTP_CACHE = False                  # tahame päris vastuseid
+    main.DEBUG.level = "off"
+    main.FETCH_RATINGS_MAX_PER_STORE = 0     # PDP-d võtame allpool ise
+    try:
+        rows = main.COLLECTORS[store](args.query) or []
+        recording = False
+        urls = [r["url"] for r in rows if r.get("url")][:args.pdp]
+        if urls and store in ("1a", "kaup24"):
+            pages = main.BROWSER.pages_html(urls, store=store, kind="pdp")
+        else:
+            pages = []
+            for u in urls:
+                r = orig_get(u, headers={"User-Agent": main.UA}, timeout=20)
+                pages.append(r.text if r.status_code == 200 else RuntimeError(f"HTTP {r.status_code}"))
+        for u, html in zip(urls, pages):
+            if isinstance(html, Exception):
+                print(f"[WARN] {u}: {html}")
+                continue
+            saved.append(save_page(root, store, "pdp", html))
+    finally:
+        main.http_get, main.BROWSER.page_html = orig_get, orig_page
+    for p in saved:
+        print(f"salvestasin {p}")
+    return 0 if saved else 1
+
+RUN_LABELS = {   # silumisarhiivi sildid, mis on terved otsingu-/kategoorialehed
+    "debug_euronics_search": "euronics",
+    "debug_euronics_category": "euronics",
+    "debug_1a_pw": "1a",
+    "debug_kaup24_pw": "kaup24",
+}
+
+def import_run(args) -> int:
+    root = Path(args.corpus)
+    arts = main.DEBUG.artifacts_for(args.run_id)
+    n = 0
+    for a in arts:
+        store = RUN_LABELS.get(a["label"])
+        if store:
+            print(f"salvestasin {save_page(root, store, 'listing', main.DEBUG.read(a['sha']))}")
+            n += 1
+    if not n:
+        print(f"Jooksus '{args.run_id}' polnud terveid lehti ({main.DEBUG_DIR}/runs).")
+    return 0 if n else 1
+
+# ----------------------------------
+# MÕÕDETAVAD PLOKID
+# ----------------------------------
+
+def parse_listing(store: str, text: str) -> list[dict]:
+    if store == "klick":
+        records, _ = main._klick_records(json.loads(text))
+        return [r for r in map(main._klick_row, records) if r]
+    if store == "euronics":
+        return main.parse_euronics_cards(text, "bench", dump=False)
+    if store == "1a":
+        return main.parse_1a_cards(text, dump=False)
+    return main.parse_kaup24_cards(text, dump=False)
+
+def blocks(corpus: dict, args, rows: list[dict] | None = None) -> dict:
+    """
+    {plokk: ehitaja}; ehitaja() -> (fn, lehti, ühikuid | None, ühik). Ettevalmistus
+    (kaartide valik jms) käib ehitajas, et see ei läheks ploki aja ega mälu sisse.
+    `rows` = filter_rows sisend (vaikimisi parsitakse korpus).
+    """
+    out = {}
+    for store in STORES:
+        pages = [(rel, text) for s, rel, text in corpus["listing"] if s == store]
+        if pages:
+            out[f"parse_cards[{store}]"] = lambda store=store, pages=pages: (
+                lambda: [parse_listing(store, t) for _, t in pages], len(pages), None, "rida")
+
+    def cards(store):
+        return [c for s, _, t in corpus["listing"] if s == store for c in main.select_cards(t, store)]
+
+    if any(s == "1a" for s, _, _ in corpus["listing"]):
+        def b():
+            cs = cards("1a")
+            return lambda: [main._extract_1a_name_link_prices(c) for c in cs], 0, len(cs), "kaart"
+        out["_extract_1a_name_link_prices"] = b
+    if any(s == "kaup24" for s, _, _ in corpus["listing"]):
+        def b():
+            cs = cards("kaup24")
+            return lambda: [main._kaup24_widget_json(c) for c in cs], 0, len(cs), "kaart"
+        out["_kaup24_widget_json"] = b
+
+    pdps = corpus["pdp"]
+    if pdps:
+        out["_best_rating_from_html"] = lambda: (
+            lambda: [main._best_rating_from_html(t) for _, _, t in pdps], len(pdps), len(pdps), "leht")
+
+    query = args.query or main.read_query()
+
+    def b():
+        base = rows if rows is not None else [r for s, _, t in corpus["listing"] for r in parse_listing(s, t)]
+        big = base * max(1, -(-args.filter_rows // max(1, len(base))))
+        classifier = main.classifier_for(query)
+        return lambda: main.filter_rows(big, query, classifier=classifier), 0, len(big), "rida"
+    out["filter_rows"] = b
+    return out
+
+def best_time(fn, repeat: int) -> tuple[float, object]:
+    best, result = None, None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            result = fn()
+            dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, result
+
+def _maxrss_kib() -> float:
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / 1024 if sys.platform == "darwin" else r     # macOS: baidid, Linux: KiB
+
+def _proc_status(key: str) -> int:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(key + ":"):
+            return int(line.split()[1])
+    raise KeyError(key)
+
+def _reset_peak() -> float | None:
+    """Linux: nulli tipp (VmHWM) ja tagasta praegune RSS; mujal None (jääb ru_maxrss)."""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+        return _proc_status("VmRSS")
+    except (OSError, KeyError):
+        return None
+
+def rss_child(args) -> int:
+    """Alamprotsess: ehita plokk, soojenda bs4/lxml, mõõda ühe käigu RSS-tipu kasv (KiB)."""
+    corpus = load_corpus(Path(args.corpus))
+    main._JOB.prefilter = args.prefilter
+    rows = json.loads(Path(args.rows_file).read_text(encoding="utf-8")) if args.rows_file else None
+    import lxml.html  # noqa: F401
+    main._bs4().BeautifulSoup("<p></p>", "lxml")
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn, *_ = blocks(corpus, args, rows)[args.block]()
+        gc.collect()
+        # ru_maxrss on kogu protsessi tipp: ettevalmistus ja importid võivad selle juba
+        # plokist kõrgemale viia, seega Linuxil nullitakse tipp enne plokki.
+        base = _reset_peak()
+        if base is None:
+            base = _maxrss_kib()
+            fn()
+            peak = _maxrss_kib()
+        else:
+            fn()
+            peak = _proc_status("VmHWM")
+    print(f"{peak - base:.0f}")
+    return 0
+
+def rss_peak(args, block: str, rows_file: str | None) -> float | None:
+    cmd = [sys.executable, __file__, "--corpus", args.corpus, "_rss", block,
+           "--prefilter", args.prefilter, "--filter-rows", str(args.filter_rows)]
+    if args.query:
+        cmd += ["--query", args.query]
+    if rows_file:
+        cmd += ["--rows-file", rows_file]
+    res = subprocess.run(cmd, capture_output=True, text=True)
+    try:
+        return float(res.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        print(f"  [WARN] {block}: RSS mõõtmine ebaõnnestus: {res.stderr.strip()[-200:]}")
+        return None
+
+def run(args) -> int:
+    root = Path(args.corpus)
+    corpus = load_corpus(root)
+    if not corpus["listing"] and not corpus["pdp"]:
+        print(f"Korpus on tühi ({root}). Vaata: python bench/parsers.py capture --help")
+        return 1
+    main._JOB.prefilter = args.prefilter
+    query = args.query or main.read_query()
+
+    golden_path = root / "golden.json"
+    try:
+        golden = json.loads(golden_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        golden = {}
+    got: dict[str, dict] = {}
+    all_rows: list[dict] = []
+    results = []   # (plokk, aeg, lehti, ühikuid, ühik, RSS kasv)
+
+    specs = blocks(corpus, args)
+    with tempfile.TemporaryDirectory() as tmp:
+        rows_file = os.path.join(tmp, "rows.json")
+        for name, build in specs.items():
+            if name == "filter_rows":
+                specs = blocks(corpus, args, all_rows)
+                build = specs[name]
+                Path(rows_file).write_text(json.dumps(all_rows), encoding="utf-8")
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn, pages, units, unit = build()
+            dt, out = best_time(fn, args.repeat)
+            rss = None if args.no_rss else rss_peak(args, name, rows_file if name == "filter_rows" else None)
+            if name.startswith("parse_cards["):
+                store = name[len("parse_cards["):-1]
+                rels = [rel for s, rel, _ in corpus["listing"] if s == store]
+                for rel, rows in zip(rels, out):
+                    got.setdefault("parse_cards", {})[rel] = rows
+                    all_rows.extend(rows)
+                units = sum(len(r) for r in out)
+            elif name == "_best_rating_from_html":
+                got["best_rating"] = {rel: r for (_, rel, _), r in zip(corpus["pdp"], out)}
+            elif name == "filter_rows":
+                got["filter_rows"] = {query: [r["url"] for r in main.filter_rows(all_rows, query)]}
+            results.append((name, dt, pages, units, unit, rss))
+
+    print(f"{'plokk':<32}{'ms':>9}{'lehte/s':>10}{'ühikut/s':>12}  {'ühik':<6}{'RSS+ KiB':>10}")
+    for name, dt, pages, units, unit, rss in results:
+        pps = f"{pages / dt:.1f}" if pages and dt else "-"
+        ups = f"{units / dt:.0f}" if dt else "-"
+        mem = f"{rss:.0f}" if rss is not None else "-"
+        print(f"{name:<32}{dt * 1000:>9.2f}{pps:>10}{ups:>12}  {unit:<6}{mem:>10}")
+    if sum(len(t) for _, _, t in corpus["listing"]) < 256 * 1024:
+        print("(korpus on väike – ajad ja mälu pole päris lehtede kohta esinduslikud, vt capture)")
+
+    if args.update_golden:
+        golden_path.write_text(json.dumps(got, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"kuldsed tulemused → {golden_path}")
+        return 0
+
+    bad = 0
+    for block, items in got.items():
+        for key, value in items.items():
+            want = golden.get(block, {}).get(key)
+            if want is None:
+                print(f"  (kulda pole) {block} :: {key}")
+            elif want != value:
+                bad += 1
+                print(f"  ERINEB {block} :: {key}")
+    print("kuldsed tulemused: " + ("OK" if not bad else f"{bad} erinevust"))
+    return 1 if bad else 0
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Parserite võrdlusmõõtmine salvestatud korpusel")
+    ap.add_argument("--corpus", default=str(CORPUS_DIR), help=f"korpuse kaust (vaikimisi {CORPUS_DIR})")
+    sub = ap.add_subparsers(dest="cmd")
+
+    p = sub.add_parser("run", help="mõõda ja võrdle kuldsete tulemustega")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--query", help="filter_rows päring (vaikimisi configs/default.txt)")
+    p.add_argument("--prefilter", choices=main.PREFILTERS, default="dualsense_white")
+    p.add_argument("--filter-rows", type=int, default=10000)
+    p.add_argument("--update-golden", action="store_true")
+    p.add_argument("--no-rss", action="store_true", help="ära mõõda mälu alamprotsessides")
+
+    p = sub.add_parser("_rss")          # sisekasutus: ühe ploki mälu alamprotsessis
+    p.add_argument("block")
+    p.add_argument("--query")
+    p.add_argument("--prefilter", choices=main.PREFILTERS, default="dualsense_white")
+    p.add_argument("--filter-rows", type=int, default=10000)
+    p.add_argument("--rows-file")
+
+    p = sub.add_parser("capture", help="kogu korpusesse päris lehti")
+    p.add_argument("store", choices=STORES)
+    p.add_argument("query")
+    p.add_argument("--pdp", type=int, default=0, help="mitu tootelehte lisaks salvestada")
+
+    p = sub.add_parser("import-run", help="võta terved lehed silumisarhiivist")
+    p.add_argument("run_id", help="jooksu id või 'last'")
+
+    args = ap.parse_args()
+    if args.cmd == "capture":
+        return capture(args)
+    if args.cmd == "import-run":
+        return import_run(args)
+    if args.cmd == "_rss":
+        return rss_child(args)
+    if args.cmd is None:
+        args = ap.parse_args(["--corpus", args.corpus, "run"])
+    return run(args)
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Mõõda käivitusaega: värske interpretaator, `import main` ja `main.py --help`.
+Näitab ka, millised rasked sõltuvused pärast importi juba laetud on (peaks
+olema tühi – need tulevad alles koguja esimesel kasutusel).
+
+    python bench/startup.py
+    python bench/startup.py --repeat 20 --importtime     # + suurimad moodulid
+"""
+
+import argparse, os, statistics, subprocess, sys, time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+HEAVY = ("requests", "bs4", "lxml", "playwright", "asyncio")
+
+CASES = {
+    "python -c pass": [sys.executable, "-c", "pass"],
+    "import main": [sys.executable, "-c", "import main"],
+    "main.py --help": [sys.executable, str(SRC / "main.py"), "--help"],
+    "import main + klick parse": [sys.executable, "-c",
+        "import main; main._klick_records({'result': []})"],
+    "import main + bs4/lxml": [sys.executable, "-c",
+        "import main; main.select_cards('<div class=\"c-product-card\"></div>', 'kaup24')"],
+}
+
+def wall(cmd: list[str], repeat: int) -> list[float]:
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        out.append(time.perf_counter() - t0)
+    return out
+
+def loaded_after_import() -> list[str]:
+    code = f"import sys, main; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    res = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return [m for m in res.stdout.strip().split(",") if m]
+
+def importtime_top(n: int) -> list[tuple[int, str]]:
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                         env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in res.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:n]
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Käivitusaja mõõtmine")
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--importtime", action="store_true", help="näita -X importtime suurimaid")
+    args = ap.parse_args()
+
+    print(f"{'juhtum':<28}{'mediaan ms':>12}{'min ms':>10}")
+    for name, cmd in CASES.items():
+        ts = wall(cmd, args.repeat)
+        print(f"{name:<28}{statistics.median(ts) * 1000:>12.1f}{min(ts) * 1000:>10.1f}")
+
+    heavy = loaded_after_import()
+    print(f"pärast 'import main' laetud: {', '.join(heavy) if heavy else '-'}")
+    if args.importtime:
+        for us, mod in importtime_top(10):
+            print(f"{us / 1000:>9.1f} ms  {mod}")
+    return 1 if heavy else 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
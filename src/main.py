@@ -1,70 +1,165 @@
 # -*- coding: utf-8 -*-
+from __future__ import annotations
 
 import re
 from pathlib import Path
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-import json
 import html as htmlesc
 
 import argparse, time, sys, traceback, json
+import atexit, base64, gzip, hashlib, os, queue, random, shutil, sqlite3, threading
+from contextlib import contextmanager
+from itertools import zip_longest
+from urllib.parse import quote, urljoin, urlsplit, urlunsplit
 
-import requests
-from bs4 import BeautifulSoup
-from bs4 import NavigableString
-from urllib.parse import urljoin
-from urllib.parse import quote, urljoin
-from urllib.parse import urlsplit, urlunsplit
-from playwright.sync_api import sync_playwright
+# requests, bs4, lxml ja playwright laetakse alles esimesel kasutusel (vt
+# "LAISAD IMPORDID") – ühe poe lühike jooks ei maksa teiste sõltuvuste eest.
+
+try:
+    import zstandard
+except ImportError:       # valikuline – ilma selleta pakime gzipiga
+    zstandard = None
+
+# ----------------------------------
+# LAISAD IMPORDID
+# ----------------------------------
+
+def _asyncio():
+    import asyncio        # ainult brauseri jaoks
+    return asyncio
+
+def _requests():
+    import requests
+    return requests
+
+def _bs4():
+    import bs4
+    return bs4
 
 # ----------------------------------
 # ÜLDINE KONF / ABI
 # ----------------------------------
 
+OUT_DIR = "out"                      # tulemusleht, last_success.json, silumisfailid
 UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
 
-FETCH_RATINGS_MAX_PER_STORE = 1   
-FETCH_RATINGS_TIMEOUT_S = 25
+FETCH_RATINGS_MAX_PER_STORE = None   # PDP värskendusi poe kohta ühes jooksus; None = kõik (piiriks RATINGS_BUDGET_S)
+FETCH_RATINGS_TIMEOUT_S = 25         # ühe PDP laadimise piir
+RATINGS_BUDGET_S = 40                # kogu reitingukäigu ajaeelarve poe kohta
+RATINGS_PAGES = 4                    # paralleelseid brauserilehti ühe käigu kohta
+RATINGS_PER_HOST = 4                 # samaaegseid PDP-sid ühe hosti kohta (üle kõigi käikude)
 
+# Poed, mille otsing vajab oma fraasi ka --query korral (teised saavad päringu ise).
 STORE_DEFAULT_QUERIES = {
     "1a": "Mängukontroller Sony DualSense, valge/must",
-    "kaup24": "Sony DualSense valge",
 }
 
+# Reitingu leidmine PDP-lt. Üks regex-läbimine üle toore HTML-i korjab JSON-LD plokid
+# ja märgib, kas lehel on mikroandmeid (.c-rating / itemprop=aggregateRating). Puu
+# ehitame ainult siis, kui JSON-LD ei andnud midagi ja mikroandmed on olemas.
+_RATING_SCAN_RE = re.compile(
+    r"""<script\b[^>]*\btype\s*=\s*(["']?)application/ld\+json\1[^>]*>(?P<ld>.*?)</script\s*>"""
+    r"""|(?P<md>itemprop\s*=\s*["']?aggregaterating|c-rating)""",
+    re.I | re.S,
+)
+_RATING_FALLBACK_RES = tuple(re.compile(p, re.I) for p in (
+    r'itemprop=["\']ratingvalue["\'][^>]*content=["\']([0-5](?:[.,]\d)?)',
+    r'"ratingvalue"\s*:\s*"?([0-5](?:[.,]\d)?)"?',
+    r'aria-label=["\'][^"\']*([0-5](?:[.,]\d)?)\s*/\s*5',
+    r'data-rating(?:-value)?=["\']([0-5](?:[.,]\d)?)',
+))
+
+def _rating_1dp(val) -> str:
+    return f"{float(str(val).replace(',', '.')):.1f}"
+
+def _jsonld_objs(blocks):
+    for data in blocks:
+        for obj in (data if isinstance(data, list) else [data]):
+            yield obj
+
+def _microdata_rating(html: str) -> str:
+    soup = _bs4().BeautifulSoup(html, "lxml")
+    el = (soup.select_one('[itemprop="aggregateRating"] [itemprop="ratingValue"]') or
+          soup.select_one(".c-rating [data-rating]") or
+          soup.select_one(".c-rating__value"))
+    if el:
+        return (el.get("content") or el.get("data-rating") or el.get_text(strip=True) or "").strip()
+    return ""
+
 def _best_rating_from_html(html: str) -> str:
-    for f in (_jsonld_rating_from_html, _parse_rating_from_html):
+    """Reiting kujul '4.5' või ''. Enne JSON-LD, siis mikroandmed, siis regexid toorel HTML-il."""
+    html = html or ""
+    blocks, has_microdata = [], False
+    for m in _RATING_SCAN_RE.finditer(html):
+        if m.group("md") is not None:
+            has_microdata = True
+            continue
         try:
-            v = f(html)
-            if v:
-                return f"{float(str(v).replace(',', '.')):.1f}"
+            blocks.append(json.loads(m.group("ld")))
         except Exception:
-            pass
-
-    lower = html.lower()
+            continue
 
-    m = re.search(r'itemprop=["\']ratingvalue["\'][^>]*content=["\']([0-5](?:[.,]\d)?)', lower)
-    if not m:
-        m = re.search(r'"ratingvalue"\s*:\s*"?([0-5](?:[.,]\d)?)"?', lower)
-    if not m:
-        m = re.search(r'aria-label=["\'][^"\']*([0-5](?:[.,]\d)?)\s*/\s*5', lower)
-    if not m:
-        m = re.search(r'data-rating(?:-value)?=["\']([0-5](?:[.,]\d)?)', lower)
+    # 1) Product.aggregateRating / AggregateRating
+    try:
+        for obj in _jsonld_objs(blocks):
+            if not isinstance(obj, dict):
+                continue
+            if obj.get("@type") == "Product":
+                ar = obj.get("aggregateRating") or {}
+                val = ar.get("ratingValue") or ar.get("rating")
+                if val is not None:
+                    try:
+                        return _rating_1dp(val)
+                    except Exception:
+                        pass
+            if obj.get("@type") == "AggregateRating":
+                val = obj.get("ratingValue")
+                if val is not None:
+                    try:
+                        return _rating_1dp(val)
+                    except Exception:
+                        pass
+    except Exception:
+        pass
 
-    if m:
+    # 2) ükskõik milline objekt aggregateRatinguga, siis mikroandmed
+    v = None
+    try:
+        for obj in _jsonld_objs(blocks):
+            if isinstance(obj, dict) and obj.get("aggregateRating"):
+                val = obj["aggregateRating"].get("ratingValue")
+                if val:
+                    v = str(val).strip()
+                    break
+    except Exception:
+        v = ""
+    if v is None and has_microdata:
+        v = _microdata_rating(html)
+    if v:
         try:
-            return f"{float(m.group(1).replace(",", ".")):.1f}"
+            return _rating_1dp(v)
         except Exception:
-            return m.group(1).replace(",", ".")
+            pass
+
+    # 3) regexid toore HTML-i peal
+    for rx in _RATING_FALLBACK_RES:
+        m = rx.search(html)
+        if m:
+            try:
+                return _rating_1dp(m.group(1))
+            except Exception:
+                return m.group(1).replace(",", ".")
     return ""
 
 def _price_from_1a_pdp(base: str, href: str) -> str:
     try:
         url = urljoin(base, href)
-        r = requests.get(url, headers=HDRS, timeout=20)
+        r = http_get(url, headers=HDRS, timeout=20, store="1a")
         if r.status_code != 200:
             return ""
-        s = BeautifulSoup(r.text, "lxml")
+        s = _bs4().BeautifulSoup(r.text, "lxml")
         meta = s.select_one('meta[itemprop="price"][content]')
         if meta and meta.get("content"):
             return clean_price(meta["content"])
@@ -74,32 +169,6 @@ def _price_from_1a_pdp(base: str, href: str) -> str:
     except Exception:
         return ""
 
-import json
-
-def _parse_rating_from_html(html: str) -> str:
-    """Proovi võtta reiting JSON-LD-st või tähisest .c-rating."""
-    soup = BeautifulSoup(html, "lxml")
-
-    for s in soup.select('script[type="application/ld+json"]'):
-        try:
-            data = json.loads(s.string or "{}")
-        except Exception:
-            continue
-        candidates = data if isinstance(data, list) else [data]
-        for obj in candidates:
-            if isinstance(obj, dict) and obj.get("aggregateRating"):
-                val = obj["aggregateRating"].get("ratingValue")
-                if val:
-                    return str(val).strip()
-    el = (soup.select_one('[itemprop="aggregateRating"] [itemprop="ratingValue"]') or
-          soup.select_one(".c-rating [data-rating]") or
-          soup.select_one(".c-rating__value"))
-    if el:
-        return (el.get("content") or el.get("data-rating") or el.get_text(strip=True) or "").strip()
-    return ""
-
-import json
-
 def _extract_prices_generic(node) -> tuple[str, str]:
     txt = node.get_text(" ", strip=True)
     nums = re.findall(r"(\d+[\s.,]\d{2})\s*€", txt) or re.findall(r"\d+[\s.,]\d{2}", txt)
@@ -120,45 +189,6 @@ def _extract_prices_generic(node) -> tuple[str, str]:
     a = to_f(nums[0])
     return (f"{a:.2f}" if a is not None else clean_price(nums[0])), ""
 
-def _jsonld_rating_from_html(html: str) -> str:
-    soup = BeautifulSoup(html, "lxml")
-    for sc in soup.select('script[type="application/ld+json"]'):
-        raw = sc.string or sc.get_text() or ""
-        try:
-            data = json.loads(raw)
-        except Exception:
-            continue
-
-        def iter_objs(x):
-            if isinstance(x, list):
-                for i in x: yield i
-            else:
-                yield x
-
-        for obj in iter_objs(data):
-            if not isinstance(obj, dict):
-                continue
-            if obj.get("@type") == "Product":
-                ar = obj.get("aggregateRating") or {}
-                val = ar.get("ratingValue") or ar.get("rating")
-                if val is None and isinstance(ar, dict):
-                    val = ar.get("ratingValue")
-                if val is not None:
-                    try:
-                        f = float(str(val).replace(",", "."))
-                        return f"{f:.1f}"
-                    except Exception:
-                        pass
-            if obj.get("@type") == "AggregateRating":
-                val = obj.get("ratingValue")
-                if val is not None:
-                    try:
-                        f = float(str(val).replace(",", "."))
-                        return f"{f:.1f}"
-                    except Exception:
-                        pass
-    return ""
-
 def _kaup24_widget_json(card):
     wd = card.get("widget-data") or card.get("widgetdata") or ""
     if not wd:
@@ -168,9 +198,6 @@ def _kaup24_widget_json(card):
     except Exception:
         return None
 
-from zoneinfo import ZoneInfo
-import re
-
 def _parse_price(text: str):
     if not text:
         return None
@@ -195,6 +222,1052 @@ HDRS = {
     "Upgrade-Insecure-Requests": "1",
 }
 
+# ----------------------------------
+# MÕÕDIKUD (jooksu kaupa, poe ja etapi kaupa)
+# ----------------------------------
+
+# Iga etapp (fetch, nav, parse, ratings, collect, render, ...) kogub aja ja
+# kordade arvu; lisaks loendurid (bytes, cards, rows, ...) ja HTTP staatused.
+# Pood tuleb lõimelokaalsest _JOB.store-ist – väljaspool poe tööd läheb kõik
+# jooksu üldisesse osasse.
+PROM_FILE: str | None = None
+
+class RunMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stores: dict[str, dict] = {}
+            self._run: dict = {}
+            self._t0 = time.monotonic()
+
+    def _bucket(self, store: str | None) -> dict:
+        store = store or getattr(_JOB, "store", None)
+        if not store:
+            return self._run
+        return self._stores.setdefault(store, {})
+
+    def add(self, key: str, value: float = 1, store: str | None = None) -> None:
+        with self._lock:
+            b = self._bucket(store)
+            b[key] = b.get(key, 0) + value
+
+    def put(self, key: str, values: dict, store: str | None = None) -> None:
+        """Lisa sõnastikku `key` (nt URL -> latentsus)."""
+        with self._lock:
+            self._bucket(store).setdefault(key, {}).update(values)
+
+    def status(self, code: int, store: str | None = None) -> None:
+        with self._lock:
+            st = self._bucket(store).setdefault("http_status", {})
+            st[str(code)] = st.get(str(code), 0) + 1
+
+    @contextmanager
+    def timed(self, stage: str, store: str | None = None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            with self._lock:
+                st = self._bucket(store).setdefault("stages", {}).setdefault(stage, {"s": 0.0, "n": 0})
+                st["s"] += dt
+                st["n"] += 1
+
+    def snapshot(self) -> dict:
+        def rounded(b):
+            out = dict(b)
+            if "stages" in b:
+                out["stages"] = {k: {"s": round(v["s"], 3), "n": v["n"]} for k, v in b["stages"].items()}
+            return out
+
+        with self._lock:
+            return {
+                "duration_s": round(time.monotonic() - self._t0, 3),
+                "run": rounded(self._run),
+                "stores": {k: rounded(v) for k, v in sorted(self._stores.items())},
+            }
+
+METRICS = RunMetrics()
+
+def _stage(name: str):
+    """Dekoraator: funktsiooni aeg läheb etappi `name` (jooksva poe all)."""
+    def deco(fn):
+        def wrapper(*a, **kw):
+            with METRICS.timed(name):
+                return fn(*a, **kw)
+        wrapper.__name__, wrapper.__doc__ = fn.__name__, fn.__doc__
+        return wrapper
+    return deco
+
+def _job_state() -> dict:
+    """Lõimelokaalne tööolek (pood, eelfilter) – sisemistele lõimedele edasiandmiseks."""
+    return dict(vars(_JOB))
+
+def _set_job_state(state: dict) -> None:
+    vars(_JOB).update(state)
+
+def _prom_escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def write_prom_file(path: str, snap: dict, ok: bool = True) -> None:
+    """Prometheuse node_exporteri textfile-collectori formaat."""
+    lines = [
+        "# TYPE hinnad_last_run_timestamp_seconds gauge",
+        f"hinnad_last_run_timestamp_seconds {time.time():.0f}",
+        "# TYPE hinnad_last_run_success gauge",
+        f"hinnad_last_run_success {int(ok)}",
+        "# TYPE hinnad_run_duration_seconds gauge",
+        f"hinnad_run_duration_seconds {snap['duration_s']}",
+    ]
+    stages, calls, counters, statuses = [], [], {}, []
+    buckets = [("", snap["run"])] + list(snap["stores"].items())
+    for store, b in buckets:
+        lbl = f'store="{_prom_escape(store)}"'
+        for stage, v in b.get("stages", {}).items():
+            stages.append(f'hinnad_stage_seconds{{{lbl},stage="{_prom_escape(stage)}"}} {v["s"]}')
+            calls.append(f'hinnad_stage_calls{{{lbl},stage="{_prom_escape(stage)}"}} {v["n"]}')
+        for code, n in b.get("http_status", {}).items():
+            statuses.append(f'hinnad_http_responses{{{lbl},code="{code}"}} {n}')
+        for k, v in b.items():
+            if isinstance(v, (int, float)):
+                counters.setdefault(re.sub(r"[^a-z0-9_]", "_", k.lower()), []).append(f"{{{lbl}}} {v}")
+    for name, rows in (("hinnad_stage_seconds", stages), ("hinnad_stage_calls", calls),
+                       ("hinnad_http_responses", statuses)):
+        if rows:
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(rows)
+    for k, rows in sorted(counters.items()):
+        lines.append(f"# TYPE hinnad_{k} gauge")
+        lines.extend(f"hinnad_{k}{r}" for r in rows)
+    _atomic_write_text(path, "\n".join(lines) + "\n")
+
+# ----------------------------------
+# HTTP SESSIOON (ühine ühenduste kogum)
+# ----------------------------------
+
+HTTP_POOL_CONNECTIONS = 8      # mitme hosti ühendusi hoitakse korraga
+HTTP_POOL_MAXSIZE = 8          # avatud ühendusi ühe hosti kohta
+HTTP_RETRIES = 2
+HTTP_BACKOFF_S = 0.5           # 0.5 s, 1 s, 2 s, ...
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_http_lock = threading.Lock()
+_http_session: requests.Session | None = None
+
+def http_session() -> requests.Session:
+    """Protsessi ühine Session – ühendused jäävad --every tsüklite vahel lahti."""
+    global _http_session
+    with _http_lock:
+        if _http_session is None:
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            retry = Retry(
+                total=HTTP_RETRIES,
+                backoff_factor=HTTP_BACKOFF_S,
+                status_forcelist=HTTP_RETRY_STATUSES,
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                max_retries=retry,
+            )
+            s = _requests().Session()
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update({"User-Agent": UA})
+            _http_session = s
+        return _http_session
+
+def http_close() -> None:
+    global _http_session
+    with _http_lock:
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+
+atexit.register(http_close)
+
+def http_get(url: str, *, params=None, headers=None, timeout=20, store: str | None = None,
+             cache: bool = True) -> requests.Response:
+    """
+    GET ühise sessiooniga. Kui `store` on antud ja vahemälu lubatud, käib päring
+    läbi kettavahemälu: värske koopia tagastatakse kohe, aegunu revalideeritakse
+    (If-None-Match / If-Modified-Since) ja 304 loetakse tabamuseks.
+    """
+    if NET_TAPE.replaying:
+        with METRICS.timed("fetch"):
+            r = NET_TAPE.http_replay(url, params=params)
+        METRICS.status(r.status_code)
+        return r
+    t0 = time.perf_counter()
+    with METRICS.timed("fetch"):
+        if not (cache and store and HTTP_CACHE):
+            r = http_session().get(url, params=params, headers=headers, timeout=timeout)
+        else:
+            r = HTTP_CACHE_STORE.get(url, params=params, headers=headers, timeout=timeout, store=store)
+    METRICS.status(r.status_code)
+    if getattr(r, "from_cache", False):
+        METRICS.add("http_cache_hits")
+    else:
+        METRICS.add("bytes", len(r.content))
+    if NET_TAPE.recording:
+        NET_TAPE.http_record(url, params, r, time.perf_counter() - t0)
+    return r
+
+# ----------------------------------
+# HTTP VAHEMÄLU (kettal, LRU)
+# ----------------------------------
+
+HTTP_CACHE = True
+HTTP_CACHE_DIR = "out/http_cache"
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+HTTP_CACHE_TTL_S = {          # kui kaua vastust usaldame ilma serverilt küsimata
+    "euronics": 300,
+    "klick": 120,
+    "1a": 3600,               # tootelehed
+    "kaup24": 300,
+    "1a_search": 60,          # otsinguleht HTTP astmes – lühem kui deemoni intervall
+    "kaup24_search": 60,
+}
+HTTP_CACHE_VARY = ("Accept", "Accept-Language")   # päised, mis kuuluvad võtmesse
+
+class HttpCache:
+    """
+    Vastused kettal: <võti>.json (meta) + <võti>.body. Võti = sha256(URL + VARY päised).
+    Salvestame ainult 200 vastused; LRU järjekord on body faili mtime.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: int | None = None
+
+    def _key(self, url: str, headers: dict) -> str:
+        h = _requests().structures.CaseInsensitiveDict(headers or {})
+        parts = [url] + [f"{k}:{h.get(k, '')}" for k in HTTP_CACHE_VARY]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def _load(self, key: str):
+        try:
+            meta = json.loads((self.root / f"{key}.json").read_text(encoding="utf-8"))
+            body = (self.root / f"{key}.body").read_bytes()
+            return meta, body
+        except (OSError, ValueError):
+            return None, None
+
+    def _response(self, meta: dict, body: bytes) -> requests.Response:
+        r = _requests().Response()
+        r.status_code = 200
+        r.reason = "OK"
+        r.url = meta["url"]
+        r.headers = _requests().structures.CaseInsensitiveDict(meta.get("headers") or {})
+        r.encoding = meta.get("encoding")
+        r._content = body
+        r.from_cache = True
+        return r
+
+    def _touch(self, key: str) -> None:
+        try:
+            os.utime(self.root / f"{key}.body")
+        except OSError:
+            pass
+
+    def _write_meta(self, key: str, meta: dict) -> None:
+        _atomic_write_text(self.root / f"{key}.json", json.dumps(meta, ensure_ascii=False))
+
+    def get(self, url: str, *, params=None, headers=None, timeout=20, store: str) -> requests.Response:
+        full_url = _requests().Request("GET", url, params=params).prepare().url
+        key = self._key(full_url, headers)
+        meta, body = self._load(key)
+        ttl = HTTP_CACHE_TTL_S.get(store, 0)
+
+        if meta is not None and time.time() - meta.get("stored_at", 0) < ttl:
+            self._touch(key)
+            return self._response(meta, body)
+
+        hdrs = dict(headers or {})
+        if meta is not None:
+            if meta.get("etag"):
+                hdrs["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                hdrs["If-Modified-Since"] = meta["last_modified"]
+
+        r = http_session().get(full_url, headers=hdrs, timeout=timeout)
+
+        if r.status_code == 304 and meta is not None:
+            METRICS.add("http_cache_revalidated")     # loeb ka http_cache_hits alla
+            meta["stored_at"] = time.time()
+            with self._lock:
+                self._write_meta(key, meta)
+            self._touch(key)
+            return self._response(meta, body)
+
+        METRICS.add("http_cache_misses")
+        if r.status_code == 200:
+            self._store(key, full_url, r)
+        return r
+
+    def _store(self, key: str, url: str, r: requests.Response) -> None:
+        meta = {
+            "url": url,
+            "stored_at": time.time(),
+            "etag": r.headers.get("ETag", ""),
+            "last_modified": r.headers.get("Last-Modified", ""),
+            "encoding": r.encoding,
+            "headers": {k: v for k, v in r.headers.items()
+                        if k.lower() in ("content-type", "etag", "last-modified")},
+        }
+        body = r.content
+        with self._lock:
+            try:
+                self.root.mkdir(parents=True, exist_ok=True)
+                old = self.root / f"{key}.body"
+                old_size = old.stat().st_size if old.exists() else 0
+                tmp = self.root / f"{key}.body.tmp"
+                tmp.write_bytes(body)
+                os.replace(tmp, old)
+                self._write_meta(key, meta)
+            except OSError as e:
+                print(f"[HTTP cache WARN] {e}")
+                return
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(body) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan_size(self) -> int:
+        return sum(p.stat().st_size for p in self.root.glob("*.body"))
+
+    def _evict(self) -> None:
+        # vanim kasutus enne; lõikame 90%-ni, et iga salvestus ei peaks koristama
+        bodies = sorted(self.root.glob("*.body"), key=lambda p: p.stat().st_mtime)
+        target = int(self.max_bytes * 0.9)
+        for p in bodies:
+            if self._size <= target:
+                break
+            try:
+                size = p.stat().st_size
+                p.unlink()
+                p.with_suffix(".json").unlink(missing_ok=True)
+                self._size -= size
+            except OSError:
+                pass
+
+HTTP_CACHE_STORE = HttpCache(HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES)
+
+# ----------------------------------
+# SALVESTUS / TAASESITUS (--record / --replay)
+# ----------------------------------
+
+# --record KAUST salvestab iga HTTP vastuse (http_get) ja iga brauseri päringu
+# (konteksti route) HAR-i kirje kujul eraldi gzip-failina; --replay KAUST
+# serveerib need tagasi ilma võrguta. Võti = meetod + täis-URL (+ POST keha),
+# sama võtme korral jääb viimane vastus. Puuduv kirje: http_get tõstab
+# ConnectionErrori, brauser katkestab päringu.
+TAPE_DROP_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection",
+                     "set-cookie", "keep-alive")
+
+class NetTape:
+    def __init__(self):
+        self.mode: str | None = None          # None | "record" | "replay"
+        self.root: Path | None = None
+        self.latency: float | str | None = None   # None | sekundid | "rec" (salvestatud aeg)
+        self.hits = self.misses = self.saved = 0
+        self._lock = threading.Lock()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def start(self, mode: str, root: str, latency=None) -> None:
+        self.mode, self.root, self.latency = mode, Path(root), latency
+        if mode == "record":
+            self.root.mkdir(parents=True, exist_ok=True)
+        elif not self.root.is_dir():
+            raise SystemExit(f"[REPLAY] Kausta pole: {root}")
+        atexit.register(self._summary)
+
+    def _summary(self) -> None:
+        if self.recording:
+            print(f"[RECORD] salvestasin {self.saved} vastust → {self.root}")
+        else:
+            print(f"[REPLAY] {self.hits} vastust salvestusest, {self.misses} puudus")
+
+    @staticmethod
+    def _key(method: str, url: str, body: bytes | None = None) -> str:
+        h = hashlib.sha256(f"{method.upper()}\n{url}\n".encode("utf-8"))
+        h.update(body or b"")
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json.gz"
+
+    # --- salvestus ---
+
+    def save(self, source: str, method: str, url: str, post: bytes | None, status: int,
+             headers: dict, body: bytes, elapsed_s: float) -> None:
+        entry = {
+            "source": source,
+            "startedDateTime": datetime.now(ZoneInfo("UTC")).isoformat(),
+            "time": round(elapsed_s * 1000, 1),
+            "request": {"method": method.upper(), "url": url,
+                        "postData": base64.b64encode(post).decode("ascii") if post else None},
+            "response": {
+                "status": status,
+                "headers": [{"name": k, "value": v} for k, v in headers.items()
+                            if k.lower() not in TAPE_DROP_HEADERS],
+                "content": {"size": len(body), "encoding": "base64",
+                            "text": base64.b64encode(body).decode("ascii")},
+            },
+        }
+        path = self._path(self._key(method, url, post))
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(gzip.compress(json.dumps(entry).encode("utf-8"), 6))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[RECORD WARN] {url}: {e}")
+            return
+        with self._lock:
+            self.saved += 1
+
+    def http_record(self, url: str, params, r, elapsed_s: float) -> None:
+        # võti on küsitud URL, mitte suunamiste järgne r.url – taasesitus küsib sama
+        full_url = _requests().Request("GET", url, params=params).prepare().url
+        self.save("http", "GET", full_url, None, r.status_code, dict(r.headers), r.content, elapsed_s)
+
+    # --- taasesitus ---
+
+    def load(self, method: str, url: str, post: bytes | None = None) -> dict | None:
+        try:
+            entry = json.loads(gzip.decompress(self._path(self._key(method, url, post)).read_bytes()))
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            METRICS.add("replay_misses")
+            return None
+        with self._lock:
+            self.hits += 1
+        METRICS.add("replay_hits")
+        return entry
+
+    def delay_s(self, entry: dict) -> float:
+        if self.latency == "rec":
+            return entry.get("time", 0) / 1000
+        return float(self.latency or 0)
+
+    def http_replay(self, url: str, *, params=None):
+        requests = _requests()
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        entry = self.load("GET", full_url)
+        if entry is None:
+            raise requests.ConnectionError(f"replay: salvestus puudub – {full_url}")
+        time.sleep(self.delay_s(entry))
+        resp = entry["response"]
+        r = requests.Response()
+        r.status_code = resp["status"]
+        r.url = full_url
+        r.headers = requests.structures.CaseInsensitiveDict({h["name"]: h["value"] for h in resp["headers"]})
+        r._content = base64.b64decode(resp["content"]["text"])
+        r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+        return r
+
+    # --- brauser (konteksti route) ---
+
+    async def route(self, route) -> None:
+        """Lubatud päring brauserist: salvestamisel too ise ja jäta meelde, taasesitusel serveeri."""
+        req = route.request
+        post = req.post_data_buffer
+        if self.replaying:
+            entry = self.load(req.method, req.url, post)
+            if entry is None:
+                await route.abort("internetdisconnected")
+                return
+            delay = self.delay_s(entry)
+            if delay:
+                await _asyncio().sleep(delay)
+            resp = entry["response"]
+            await route.fulfill(status=resp["status"],
+                                headers={h["name"]: h["value"] for h in resp["headers"]},
+                                body=base64.b64decode(resp["content"]["text"]))
+            return
+        t0 = time.perf_counter()
+        try:
+            resp = await route.fetch()
+            body = await resp.body()
+        except Exception:
+            await route.abort()
+            return
+        self.save("browser", req.method, req.url, post, resp.status, resp.headers, body,
+                  time.perf_counter() - t0)
+        await route.fulfill(response=resp, body=body)
+
+NET_TAPE = NetTape()
+
+def _tape_state() -> None:
+    """
+    --record/--replay jooks ei tohi puutuda päris out/ olekut: väljundid (tulemusleht,
+    jälgimisnimekirja lehed, last_success.json, silumisarhiiv), ajalugu ja reitingute
+    vahemälu lähevad <DIR>/<režiim>-state/ alla. Kaust tühjendatakse igal käivitusel,
+    nii et salvestus külastab kõik PDP-d ja iga taasesitus teeb sama töö.
+    """
+    global RATINGS, PRICE_HISTORY, HISTORY_PATH, OUT_DIR, WATCHLIST_OUT_DIR, DEBUG_DIR
+    state = NET_TAPE.root / f"{NET_TAPE.mode}-state"
+    shutil.rmtree(state, ignore_errors=True)
+    state.mkdir(parents=True, exist_ok=True)
+    OUT_DIR = str(state)
+    WATCHLIST_OUT_DIR = str(state / "watchlist")
+    DEBUG_DIR = str(state / "debug")
+    DEBUG.root = Path(DEBUG_DIR)
+    RATINGS = RatingCache(state / "ratings.json")
+    PRICE_HISTORY.close()
+    HISTORY_PATH = str(state / "history.sqlite3")
+    PRICE_HISTORY = PriceHistory(HISTORY_PATH)
+    atexit.register(PRICE_HISTORY.close)
+    _tier_reset()
+
+async def _route_pass(route) -> None:
+    """Lubatud brauseripäring: tavaliselt võrku, --record/--replay korral läbi NET_TAPE."""
+    if NET_TAPE.mode:
+        await NET_TAPE.route(route)
+    else:
+        await route.continue_()
+
+# ----------------------------------
+# BRAUSER (üks Chromium protsessi kohta)
+# ----------------------------------
+
+BROWSER_HEADLESS = True
+BROWSER_CONTEXT_OPTS = {
+    "user_agent": UA,
+    "locale": "et-EE",
+    "extra_http_headers": {"Accept-Language": "et-EE,et;q=0.9,en-US;q=0.8,en;q=0.7"},
+    "viewport": {"width": 1366, "height": 900},
+}
+
+# Päringute filtreerimine: pildid, fondid, meedia ja jälgijad katkestatakse enne
+# allalaadimist. allow_hosts võidab alati (nt 1a otsingu API), deny_hosts lisandub
+# üldisele BLOCK_HOSTS loendile.
+BLOCK_RESOURCES = True
+BLOCK_RESOURCE_TYPES = ("image", "font", "media")
+BLOCK_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "googleadservices.com",
+    "doubleclick.net", "googlesyndication.com", "facebook.net", "facebook.com",
+    "hotjar.com", "clarity.ms", "bat.bing.com",
+    "criteo.com", "criteo.net", "adform.net", "tiktok.com",
+    "cookiebot.com", "omnisend.com", "smartlook.com", "yandex.ru", "mc.yandex.com",
+)
+STORE_ROUTE_RULES = {
+    "1a": {"allow_hosts": ("lupasearch.com",)},
+    "kaup24": {},
+}
+
+def _host_matches(host: str, patterns) -> bool:
+    return any(host == p or host.endswith("." + p) for p in patterns)
+
+def _route_decision(store: str, resource_type: str, url: str) -> str:
+    """'allow' või blokeerimise põhjus ('image', 'font', 'tracker', ...)."""
+    rules = STORE_ROUTE_RULES.get(store, {})
+    host = (urlsplit(url).hostname or "").lower()
+    if _host_matches(host, rules.get("allow_hosts", ())):
+        return "allow"
+    if _host_matches(host, BLOCK_HOSTS) or _host_matches(host, rules.get("deny_hosts", ())):
+        return "tracker"
+    if resource_type in rules.get("block_types", BLOCK_RESOURCE_TYPES):
+        return resource_type
+    return "allow"
+
+# Lehe valmisolek: pärast domcontentloaded ootame poe ja lehetüübi järgi kas
+# tootekaarti/reitingut (ka JSON-LD aggregateRating) või stabiilset kaartide arvu,
+# kuid mitte kauem kui cap_s. PAGE_READINESS=False taastab vana networkidle ootuse.
+PAGE_READINESS = True
+READY_POLL_S = 0.25
+READY_STABLE_POLLS = 3        # mitu järjestikust ühesugust kaartide arvu = valmis
+_RATING_READY_SELECTOR = ("[itemprop='ratingValue'], [itemprop='aggregateRating'], "
+                          ".c-rating [data-rating], .c-rating__value, [data-rating]")
+READINESS = {
+    ("1a", "search"): {
+        "selector": ".lupa-search-result-product-card, [data-cy='lupa-search-result-product-card']",
+        "stable_count": True, "cap_s": 12,
+    },
+    ("kaup24", "search"): {
+        "selector": "div.c-product-card, div.catalog-taxons-product-grid__item",
+        "stable_count": True, "cap_s": 12,
+    },
+    ("1a", "pdp"): {"selector": _RATING_READY_SELECTOR, "jsonld": "aggregateRating", "cap_s": 5},
+    ("kaup24", "pdp"): {"selector": _RATING_READY_SELECTOR, "jsonld": "aggregateRating", "cap_s": 5},
+}
+
+_READY_JS = """([sel, key]) => {
+    if (sel && document.querySelector(sel)) return true;
+    if (!key) return false;
+    for (const s of document.querySelectorAll('script[type="application/ld+json"]')) {
+        if ((s.textContent || '').includes(key)) return true;
+    }
+    return false;
+}"""
+
+async def _wait_ready(page, spec: dict) -> bool:
+    """Oota, kuni leht on loetav. Tagastab False, kui cap_s sai enne täis."""
+    cap_s = float(spec.get("cap_s", 10))
+    t_end = time.monotonic() + cap_s
+    sel = spec.get("selector") or ""
+    try:
+        await page.wait_for_function(_READY_JS, arg=[sel, spec.get("jsonld") or ""],
+                                     timeout=cap_s * 1000)
+    except Exception:
+        return False
+    if not (spec.get("stable_count") and sel):
+        return True
+
+    # kaardid võivad tulla mitmes laines – oota, kuni arv enam ei kasva
+    last, same = -1, 0
+    while time.monotonic() < t_end:
+        n = await page.locator(sel).count()
+        if n == last:
+            same += 1
+            if same >= READY_STABLE_POLLS:
+                return True
+        else:
+            last, same = n, 0
+        await _asyncio().sleep(READY_POLL_S)
+    return False
+
+class BrowserManager:
+    """
+    Üks Chromium kogu protsessi peale. Playwrighti objektid elavad oma lõimes
+    (asyncio loop), kogujad kutsuvad sünkroonseid meetodeid suvalisest lõimest
+    ja iga kutse saab isoleeritud konteksti. Kui brauser kukub, käivitatakse
+    see järgmisel kutsel uuesti.
+    """
+
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._launch_lock: asyncio.Lock | None = None
+        self._pw = None
+        self._browser = None
+        self.route_stats: dict[str, dict] = {}
+        self._host_sems: dict = {}
+
+    # --- lõim + loop ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = _asyncio().new_event_loop()
+                threading.Thread(target=loop.run_forever, name="brauser", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro, timeout: float | None = None):
+        fut = _asyncio().run_coroutine_threadsafe(coro, self._ensure_loop())
+        return fut.result(timeout)
+
+    # --- brauser ---
+
+    async def _get_browser(self):
+        if self._launch_lock is None:
+            self._launch_lock = _asyncio().Lock()
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                print("[BRAUSER] Chromium kadus – käivitan uuesti")
+                self._browser = None
+            for attempt in (1, 2):
+                try:
+                    if self._pw is None:
+                        from playwright.async_api import async_playwright
+                        self._pw = await async_playwright().start()
+                    self._browser = await self._pw.chromium.launch(headless=self.headless)
+                    METRICS.add("browser_launches")   # brauseri lõimes → jooksu ühine osa
+                    return self._browser
+                except Exception:
+                    # ka Playwrighti draiver võis surra – alusta puhtalt
+                    try:
+                        if self._pw is not None:
+                            await self._pw.stop()
+                    except Exception:
+                        pass
+                    self._pw = None
+                    if attempt == 2:
+                        raise
+
+    async def new_context(self, store: str | None = None, **opts):
+        browser = await self._get_browser()
+        try:
+            context = await browser.new_context(**{**BROWSER_CONTEXT_OPTS, **opts})
+        except Exception:
+            if browser.is_connected():
+                raise
+            browser = await self._get_browser()
+            context = await browser.new_context(**{**BROWSER_CONTEXT_OPTS, **opts})
+        if store and BLOCK_RESOURCES:
+            await self._install_blocking(context, store)
+        elif NET_TAPE.mode:
+            await context.route("**/*", _route_pass)
+        return context
+
+    async def _install_blocking(self, context, store: str) -> None:
+        st = self.route_stats.setdefault(store, {"allowed": 0, "blocked": 0, "by_reason": {}, "bytes_loaded": 0})
+
+        async def on_route(route):
+            req = route.request
+            why = _route_decision(store, req.resource_type, req.url)
+            if why == "allow":
+                st["allowed"] += 1
+                await _route_pass(route)
+            else:
+                st["blocked"] += 1
+                st["by_reason"][why] = st["by_reason"].get(why, 0) + 1
+                await route.abort()
+
+        def on_response(resp):
+            try:
+                st["bytes_loaded"] += int(resp.headers.get("content-length") or 0)
+            except Exception:
+                pass
+
+        await context.route("**/*", on_route)
+        context.on("response", on_response)
+
+    def take_route_stats(self, store: str) -> dict:
+        """Tagasta ja nulli poe blokeerimisstatistika (katkestatud päringute baite ei tea keegi)."""
+        return self.route_stats.pop(store, {}) or {}
+
+    async def _goto_ready(self, page, url: str, store: str | None, kind: str, timeout_s: float) -> None:
+        spec = READINESS.get((store, kind))
+        if spec is None or not PAGE_READINESS:
+            await page.goto(url, wait_until="networkidle", timeout=timeout_s * 1000)
+            if spec and kind == "search":
+                try:
+                    await page.wait_for_selector(spec["selector"], timeout=10000)
+                except Exception:
+                    pass
+            return
+        await page.goto(url, wait_until="domcontentloaded", timeout=timeout_s * 1000)
+        if not await _wait_ready(page, spec):
+            print(f"[BRAUSER] {store}/{kind}: valmisoleku ootus sai täis ({spec.get('cap_s')} s) – {url}")
+
+    async def _page_html(self, url: str, store: str | None, kind: str, timeout_s: float) -> str:
+        context = await self.new_context(store)
+        try:
+            page = await context.new_page()
+            await self._goto_ready(page, url, store, kind, timeout_s)
+            return await page.content()
+        finally:
+            await context.close()
+
+    def _host_sem(self, url: str):
+        host = urlsplit(url).netloc
+        sem = self._host_sems.get(host)
+        if sem is None:
+            sem = self._host_sems[host] = _asyncio().Semaphore(RATINGS_PER_HOST)
+        return sem
+
+    async def _pages_html(self, urls: list[str], store: str | None, kind: str, timeout_s: float,
+                          pages: int, budget_s: float | None) -> tuple[list, list]:
+        """
+        `pages` töölist (igaühel oma leht ühes kontekstis) võtavad URL-e ühisest
+        järjekorrast; hosti semafor piirab koormust üle kõigi samaaegsete käikude.
+        Pärast `budget_s` jäänud URL-id saavad TimeoutErrori.
+        """
+        asyncio = _asyncio()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget_s if budget_s else None
+        # hostid vaheldumisi, et ühe hosti semafor ei blokeeriks teiste URL-e
+        by_host: dict[str, list] = {}
+        for item in enumerate(urls):
+            by_host.setdefault(urlsplit(item[1]).netloc, []).append(item)
+        todo: asyncio.Queue = asyncio.Queue()
+        for group in zip_longest(*by_host.values()):
+            for item in group:
+                if item is not None:
+                    todo.put_nowait(item)
+        out: list = [None] * len(urls)
+        latency: list = [None] * len(urls)
+
+        async def worker():
+            page = None
+            while not todo.empty():
+                i, url = todo.get_nowait()
+                async with self._host_sem(url):
+                    left = deadline - loop.time() if deadline else timeout_s
+                    if left <= 0:
+                        out[i] = TimeoutError(f"ajaeelarve {budget_s} s täis")
+                        continue
+                    t0 = loop.time()
+                    try:
+                        if page is None:
+                            page = await context.new_page()
+                        await asyncio.wait_for(
+                            self._goto_ready(page, url, store, kind, min(timeout_s, left)), left)
+                        out[i] = await page.content()
+                    except Exception as e:
+                        out[i] = e if str(e) else TimeoutError(f"{type(e).__name__} ({left:.0f} s)")
+                        if page is not None:   # katkestatud navigeerimise järel uus leht
+                            try:
+                                await page.close()
+                            except Exception:
+                                pass
+                            page = None
+                    latency[i] = loop.time() - t0
+
+        context = await self.new_context(store)
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, min(pages, len(urls))))))
+        finally:
+            await context.close()
+        return out, latency
+
+    # --- sünkroonne liides kogujatele ---
+
+    def page_html(self, url: str, store: str | None = None, kind: str = "search",
+                  timeout_s: float = 45) -> str:
+        with METRICS.timed(f"nav_{kind}"):
+            html = self.run(self._page_html(url, store, kind, timeout_s))
+        METRICS.add("html_bytes", len(html))
+        return html
+
+    def pages_html(self, urls: list[str], store: str | None = None, kind: str = "pdp",
+                   timeout_s: float = 25, pages: int | None = None,
+                   budget_s: float | None = None) -> list:
+        """
+        Külasta URL-e kuni `pages` lehega korraga (vaikimisi RATINGS_PAGES);
+        tagastab iga URL-i kohta HTML-i või Exceptioni. Latentsused lähevad mõõdikutesse.
+        """
+        urls = list(urls)
+        if not urls:
+            return []
+        with METRICS.timed(f"nav_{kind}"):
+            out, latency = self.run(self._pages_html(urls, store, kind, timeout_s,
+                                                     pages or RATINGS_PAGES, budget_s))
+        METRICS.add("html_bytes", sum(len(p) for p in out if isinstance(p, str)))
+        METRICS.put(f"{kind}_latency_s", {u: round(t, 2) for u, t in zip(urls, latency) if t is not None})
+        return out
+
+    def close(self) -> None:
+        if self._loop is None:
+            return
+
+        async def _close():
+            try:
+                if self._browser is not None:
+                    await self._browser.close()
+            finally:
+                self._browser = None
+                if self._pw is not None:
+                    await self._pw.stop()
+                    self._pw = None
+
+        try:
+            self.run(_close(), timeout=15)
+        except Exception:
+            pass
+
+BROWSER = BrowserManager(headless=BROWSER_HEADLESS)
+atexit.register(BROWSER.close)
+
+# ----------------------------------
+# SILUMISARHIIV (lehed ja kaardid kettale)
+# ----------------------------------
+
+# off     – midagi ei salvestata
+# sampled – kõik iga DEBUG_SAMPLE_EVERY. jooksu kohta; muudel jooksudel ainult
+#           tõrke tõendid (nt pood andis 0 rida)
+# full    – kõik igal jooksul
+DEBUG_ARTIFACTS = "sampled"
+DEBUG_SAMPLE_EVERY = 10
+DEBUG_DIR = "out/debug"
+DEBUG_MAX_BYTES = 100 * 1024 * 1024
+DEBUG_KEEP_RUNS = 200
+
+class DebugArchive:
+    """
+    Sisu järgi adresseeritud ja pakitud väljavõtted: objects/ab/<sha256>.html.{zst,gz}.
+    Sama leht salvestatakse kettale üks kord, ka eri jooksudes. Iga jooksu kohta
+    runs/<run_id>.json loetelu (silt, pood, sha). Kirjutamine käib taustalõimes.
+    """
+
+    def __init__(self, root: str, level: str = "sampled"):
+        self.root = Path(root)
+        self.level = level
+        self.run_id = ""
+        self._runs_started = 0
+        self._sampled = False
+        self._indexes: dict[str, list[dict]] = {}   # run_id -> artefaktid (ainult taustalõimes)
+        self._lock = threading.Lock()
+        self._q: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    # --- jooksu piirid ---
+
+    def begin_run(self) -> str:
+        with self._lock:
+            self.run_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]   # sorteerub ajaliselt
+            self._sampled = self.level == "full" or (
+                self.level == "sampled" and self._runs_started % max(1, DEBUG_SAMPLE_EVERY) == 0)
+            self._runs_started += 1
+        return self.run_id
+
+    def end_run(self) -> None:
+        if self.level == "off":
+            return
+        self._put(("end", self.run_id, None, None, None))
+
+    def want(self, failure: bool = False) -> bool:
+        if self.level == "off":
+            return False
+        return self._sampled or failure
+
+    def dump(self, label: str, content, store: str = "", failure: bool = False) -> None:
+        """`content` võib olla str või funktsioon, mis tagastab str (arvutatakse taustal)."""
+        if not self.want(failure):
+            return
+        self._put(("obj", self.run_id, label, store, content))
+
+    # --- taustalõim ---
+
+    def _put(self, item) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="silumisarhiiv", daemon=True)
+                self._thread.start()
+        self._q.put(item)
+
+    def _worker(self) -> None:
+        while True:
+            kind, run_id, label, store, content = self._q.get()
+            try:
+                if kind == "obj":
+                    self._write_object(run_id, label, store, content)
+                else:
+                    self._write_run(run_id)
+                    self._enforce_budget()
+            except Exception as e:
+                print(f"[DEBUG WARN] {e}")
+            finally:
+                self._q.task_done()
+
+    def _obj_path(self, sha: str) -> Path | None:
+        d = self.root / "objects" / sha[:2]
+        for ext in (".html.zst", ".html.gz"):
+            if (d / f"{sha}{ext}").exists():
+                return d / f"{sha}{ext}"
+        return None
+
+    def _write_object(self, run_id: str, label: str, store: str, content) -> None:
+        text = content() if callable(content) else content
+        data = (text or "").encode("utf-8", errors="ignore")
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._obj_path(sha)
+        if path is None:
+            d = self.root / "objects" / sha[:2]
+            d.mkdir(parents=True, exist_ok=True)
+            if zstandard is not None:
+                path, blob = d / f"{sha}.html.zst", zstandard.ZstdCompressor(level=10).compress(data)
+            else:
+                path, blob = d / f"{sha}.html.gz", gzip.compress(data, compresslevel=6)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(blob)
+            os.replace(tmp, path)
+        self._indexes.setdefault(run_id, []).append({
+            "label": label, "store": store, "sha": sha, "bytes": len(data),
+            "path": path.relative_to(self.root).as_posix(),
+        })
+
+    def _write_run(self, run_id: str) -> None:
+        arts = self._indexes.pop(run_id, None)
+        if not arts:
+            return
+        info = {"run_id": run_id, "artifacts": arts}
+        _atomic_write_text(self.root / "runs" / f"{run_id}.json", json.dumps(info, ensure_ascii=False, indent=1))
+
+    def _enforce_budget(self) -> None:
+        runs = sorted((self.root / "runs").glob("*.json"))
+        keep = runs[-DEBUG_KEEP_RUNS:] if DEBUG_KEEP_RUNS else runs
+        for p in runs[:len(runs) - len(keep)]:
+            p.unlink(missing_ok=True)
+
+        # märgi kasutatavad objektid uuemast vanemani, kuni eelarve saab täis
+        live, total = set(), 0
+        for p in reversed(keep):
+            try:
+                arts = json.loads(p.read_text(encoding="utf-8")).get("artifacts", [])
+            except (OSError, ValueError):
+                continue
+            new = {a["path"] for a in arts} - live
+            size = sum((self.root / n).stat().st_size for n in new if (self.root / n).exists())
+            if live and total + size > DEBUG_MAX_BYTES:
+                p.unlink(missing_ok=True)
+                continue
+            live |= new
+            total += size
+
+        for obj in (self.root / "objects").glob("*/*.html.*"):
+            if obj.relative_to(self.root).as_posix() not in live:
+                obj.unlink(missing_ok=True)
+
+    def flush(self, timeout: float = 10) -> None:
+        if self._thread is None:
+            return
+        t_end = time.monotonic() + timeout
+        while self._q.unfinished_tasks and time.monotonic() < t_end:
+            time.sleep(0.05)
+
+    # --- otsing ---
+
+    def artifacts_for(self, run_id: str) -> list[dict]:
+        if run_id == "last":
+            runs = sorted((self.root / "runs").glob("*.json"))
+            if not runs:
+                return []
+            run_id = runs[-1].stem
+        try:
+            info = json.loads((self.root / "runs" / f"{run_id}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return []
+        return info.get("artifacts", [])
+
+    def read(self, sha: str) -> str:
+        path = self._obj_path(sha)
+        if path is None:
+            raise FileNotFoundError(sha)
+        blob = path.read_bytes()
+        if path.suffix == ".zst":
+            if zstandard is None:
+                raise RuntimeError("zstandard puudub – .zst faili ei saa lugeda")
+            data = zstandard.ZstdDecompressor().decompress(blob)
+        else:
+            data = gzip.decompress(blob)
+        return data.decode("utf-8", errors="replace")
+
+DEBUG = DebugArchive(DEBUG_DIR, DEBUG_ARTIFACTS)
+atexit.register(DEBUG.flush)
+
+def _atomic_write_text(path, text: str) -> None:
+    """Kirjuta ajutisse faili samas kaustas ja nimeta ümber – lugeja ei näe poolikut faili."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
 def read_query(path="configs/default.txt") -> str:
     return Path(path).read_text(encoding="utf-8").strip()
 
@@ -267,17 +1340,47 @@ def row_to_tr(row: dict) -> str:
     )
 
 
-def render_html(rows, template_path="templates/table.html", out_path="out/tulemused.html", query=""):
+def _read_json(path) -> dict:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def render_state_path(out_path: str) -> Path:
+    return Path(out_path).with_suffix(".state.json")
+
+def render_html(rows, template_path="templates/table.html", out_path=None, query="") -> bool:
+    """
+    Kirjuta tulemusleht ja kõrvalfail ainult siis, kui read (nii nagu need lehel
+    välja näevad), päring või mall on muutunud – muutmata jooks ei puutu ühtki faili
+    (peeglid ei sünkroniseeri asjata). Kirjutamine on atomaarne. Tagastab True, kui leht kirjutati.
+    """
+    out_path = out_path or f"{OUT_DIR}/tulemused.html"
     human, iso = now_tallinn()
     tpl = Path(template_path).read_text(encoding="utf-8")
     body = "\n".join(row_to_tr(r) for r in rows)
+
+    h = hashlib.sha256()
+    for part in (tpl, query, body):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    digest = h.hexdigest()
+
+    state_path = render_state_path(out_path)
+    state = _read_json(state_path)
+    if state.get("digest") == digest and Path(out_path).exists():
+        return False
+
     html = (
         tpl.replace("<!-- QUERY_NAME -->", query)
            .replace("<!-- GENERATED_AT_HUMAN -->", human)
            .replace("<!-- GENERATED_AT_ISO -->", iso)
            .replace("<!-- ROWS_GO_HERE -->", body)
     )
-    Path(out_path).write_text(html, encoding="utf-8")
+    _atomic_write_text(out_path, html)
+    _atomic_write_text(state_path, json.dumps(
+        {"digest": digest, "rows": len(rows), "changed_at": iso}, ensure_ascii=False))
+    return True
 
 # ----------------------------------
 # KOGUJAD
@@ -303,14 +1406,7 @@ def _canon_url(u: str) -> str:
     except Exception:
         return u
 
-WHITE_TOKENS = ("white", "valge", "pärlmutter", "pearl", "glacier", "midnight white")
-
-ACCESSORY_TOKENS = (
-    "laadimis", "charge", "charging", "twin charge", "dock", "docking", "station", "alus",
-    "kaabel", "cable", "juhe", "adapter", "stand", "holder", "cradle",
-    "kest", "cover", "case", "silikoon", "silico", "kaitse", "protect",
-    "snakebyte", "games world", "doubleshock", "third-party"
-)
+WHITE_TOKENS = ("white", "valge", "pärlmutter", "pearl")
 
 BLOCK_TOKENS = (
     "twin charge", "charging", "charger", "dock", "station", "alus", "cradle",
@@ -319,60 +1415,129 @@ BLOCK_TOKENS = (
     "ps4 ", " playstation 4", "xbox", "switch", "nintendo"
 )
 
-def _is_dualsense_white(name: str) -> bool:
-    n = (name or "").lower()
-    if "dualsense" not in n:
-        return False
-    if not any(w in n for w in WHITE_TOKENS):
-        return False
-    if any(tok in n for tok in ACCESSORY_TOKENS):
-        return False
-    if any(tok in n for tok in BLOCK_TOKENS):
-        return False
-    return True
+NONWHITE_TOKENS_STRICT = (
+    "roheline", "green",
+    "sinine", "blue",
+    "punane", "red",
+    "hõbe", "hõbed", "silver",
+    "hall", "grey", "gray",
+    "camouflage", "kamuflaaž", "kamo",
+    "roosa", "pink",
+    "kuld", "gold",
+    "lilla", "purple"
+)
 
-import re
+QUERY_WHITE_TOKENS = ("white", "valge", "pärlmutter", "pearl", "glacier")
 
 _ALPHA = "a-z0-9äöõü"
+_NORM_RE = re.compile(rf"[^{_ALPHA}]+")
 
 def _norm(s: str) -> str:
-    return re.sub(rf"[^{_ALPHA}]+", " ", (s or "").lower()).strip()
+    return _NORM_RE.sub(" ", (s or "").lower()).strip()
 
 def _has_word(text: str, word: str) -> bool:
     return re.search(rf"\b{re.escape(word.lower())}\b", _norm(text)) is not None
 
-def _has_any(text: str, words: tuple[str, ...]) -> bool:
-    t = _norm(text)
-    return any(re.search(rf"\b{re.escape(w)}\b", t) for w in words)
+# ----------------------------------
+# KLASSIFITSEERIMINE (kompileeritud sõnaloendid)
+# ----------------------------------
 
-def filter_rows(rows, query, debug=False):
-    q = (query or "").lower()
-    force_white = any(t in q for t in ("white", "valge", "pärlmutter", "pearl", "glacier"))
+def _any_substring_re(words) -> re.Pattern:
+    words = sorted({w for w in words if w}, key=len, reverse=True)
+    return re.compile("|".join(map(re.escape, words)) or r"(?!)")
 
-    kept = []
-    for r in rows:
-        name = r.get("name") or ""
-        url  = r.get("url")  or ""
-        store = (r.get("store") or r.get("shop") or "").strip()
+class TokenMatcher:
+    r"""
+    Sõnaloend ühe regexina: \b(?:w1|w2|...)\b. Vaste on olemas täpselt siis, kui
+    mõni sõna eraldi `\bw\b`-na leiduks, kuid tekst läbitakse üks kord.
+    Tekst peab olema juba _norm-itud.
+    """
 
-        name_n = _norm(name)
-        url_n  = _norm(url)
+    def __init__(self, words):
+        words = sorted({w for w in words if w}, key=len, reverse=True)
+        self.words = tuple(words)
+        self._rx = re.compile(r"\b(?:" + "|".join(map(re.escape, words)) + r")\b") if words else None
 
-        is_dualsense = ("dualsense" in name_n) or ("dualsense" in url_n)
-        if not is_dualsense:
-            if debug: print(f"[FILTER skip] not DualSense :: {store} :: {name}")
-            continue
+    def search(self, norm_text: str) -> str:
+        if self._rx is None or not norm_text:
+            return ""
+        m = self._rx.search(norm_text)
+        return m.group(0) if m else ""
 
-        if force_white and not (_has_any(name, WHITE_TOKENS) or _has_any(url, WHITE_TOKENS)):
-            if debug: print(f"[FILTER skip] no WHITE :: {store} :: {name}")
-            continue
+class RowClassifier:
+    """
+    filter_rows-i otsused ühe päringu jaoks. Sõnaloendid kompileeritakse üks kord,
+    nimi ja URL normaliseeritakse rea kohta üks kord.
+    """
 
-        if _has_any(name, BLOCK_TOKENS) or _has_any(url, BLOCK_TOKENS):
-            if debug: print(f"[FILTER skip] BLOCK token :: {store} :: {name}")
-            continue
+    def __init__(self, query: str, white_tokens=None, block_tokens=None, require=("dualsense",),
+                 force_white: bool | None = None):
+        q = (query or "").lower()
+        self.force_white = (any(t in q for t in QUERY_WHITE_TOKENS)
+                            if force_white is None else force_white)
+        self.require = tuple(require)
+        self.white = TokenMatcher(WHITE_TOKENS if white_tokens is None else white_tokens)
+        self.block = TokenMatcher(BLOCK_TOKENS if block_tokens is None else block_tokens)
+
+    def classify(self, row: dict) -> tuple[bool, str]:
+        name_n = _norm(row.get("name") or "")
+        url_n = _norm(row.get("url") or "")
+
+        if not all(t in name_n or t in url_n for t in self.require):
+            return False, "not DualSense"
+        if self.force_white and not (self.white.search(name_n) or self.white.search(url_n)):
+            return False, "no WHITE"
+        if self.block.search(name_n) or self.block.search(url_n):
+            return False, "BLOCK token"
+        return True, ""
+
+    def classify_many(self, rows) -> list[tuple[bool, str]]:
+        classify = self.classify
+        return [classify(r) for r in rows]
+
+_CLASSIFIERS: dict[str, RowClassifier] = {}
+
+def classifier_for(query: str) -> RowClassifier:
+    c = _CLASSIFIERS.get(query)
+    if c is None:
+        c = _CLASSIFIERS[query] = RowClassifier(query)
+    return c
+
+_DS_ANY_RE = _any_substring_re(("dualsense", "ps5", "playstation 5"))
+_WHITE_ANY_RE = _any_substring_re(WHITE_TOKENS)
+_NONWHITE_ANY_RE = _any_substring_re(NONWHITE_TOKENS_STRICT)
+
+def _is_dualsense_white(name: str) -> bool:
+    n = (name or "").lower()
+    if not _DS_ANY_RE.search(n):
+        return False
+    if not _WHITE_ANY_RE.search(n):
+        return False
+    if _NONWHITE_ANY_RE.search(n):
+        return False
+    return True
 
-        kept.append(r)
+# Kogujad jätavad juba kaartide tasemel kõrvale selgelt mittesobivad tooted.
+# Jälgimisnimekirja kirje saab selle välja lülitada ("prefilter": "none").
+PREFILTERS = ("dualsense_white", "none")
+_JOB = threading.local()
 
+def _card_ok(name: str, store: str = "") -> bool:
+    if getattr(_JOB, "prefilter", "dualsense_white") == "none":
+        return True
+    if store == "1a":
+        return _looks_like_1a_controller(name)
+    return _is_dualsense_white(name)
+
+def filter_rows(rows, query, debug=False, classifier: RowClassifier | None = None):
+    classifier = classifier or classifier_for(query)
+    kept = []
+    for r, (keep, why) in zip(rows, classifier.classify_many(rows)):
+        if keep:
+            kept.append(r)
+        elif debug:
+            store = (r.get("store") or r.get("shop") or "").strip()
+            print(f"[FILTER skip] {why} :: {store} :: {r.get('name') or ''}")
     return kept
 
 def _canon_url(u: str) -> str:
@@ -384,7 +1549,50 @@ def _canon_url(u: str) -> str:
     except Exception:
         return u
 
+# Kaartide valik. "cards" režiimis parsib lxml lehe (C-s, kiire) ja XPath leiab
+# kaardid; BeautifulSoupi ehitame ainult kaartide alampuudest, nii et kogujate
+# select_one-loogika jääb samaks. "full" = vana tee, terve leht BeautifulSoupi.
+PARSE_MODE = "cards"
+
+def _xp_class(tag: str, cls: str) -> str:
+    return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+
+CARD_SELECTORS = {   # pood -> (CSS täisrežiimi jaoks, sama XPath-ina)
+    "euronics": ("article.product-card, div.product-card",
+                 _xp_class("article", "product-card") + " | " + _xp_class("div", "product-card")),
+    "1a": ("div.lupa-search-result-product-card, [data-cy='lupa-search-result-product-card']",
+           _xp_class("div", "lupa-search-result-product-card")
+           + " | //*[@data-cy='lupa-search-result-product-card']"),
+    "kaup24": ("div.c-product-card, div.catalog-taxons-product-grid__item",
+               _xp_class("div", "c-product-card") + " | "
+               + _xp_class("div", "catalog-taxons-product-grid__item")),
+}
+
+def select_cards(html: str, store: str, mode: str | None = None) -> list:
+    cards = _select_cards(html, store, mode)
+    METRICS.add("cards", len(cards))
+    return cards
+
+def _select_cards(html: str, store: str, mode: str | None = None) -> list:
+    css, xpath = CARD_SELECTORS[store]
+    if (mode or PARSE_MODE) == "cards":
+        import lxml.html
+        try:
+            els = lxml.html.fromstring(html).xpath(xpath)
+        except Exception:
+            els = None
+        if els is not None:
+            if not els:
+                return []
+            # kõik kaardid ühte väikesesse dokumenti; pesastatud kaardid tulevad
+            # eraldi koopiatena nagu soup.select() puhul
+            frag = "".join(lxml.html.tostring(el, encoding="unicode", with_tail=False) for el in els)
+            body = _bs4().BeautifulSoup(frag, "lxml").body
+            return body.find_all(True, recursive=False) if body else []
+    return _bs4().BeautifulSoup(html, "lxml").select(css)
+
 def extract_euronics_price(card) -> str:
+    from bs4 import NavigableString
     pbox = card.select_one("div.price")
     if not pbox:
         return ""
@@ -413,12 +1621,128 @@ def extract_euronics_price(card) -> str:
 
     return clean_price(pbox.get_text(" ", strip=True))
 
-def collect_euronics(query: str) -> list[dict]:
-    import re, requests
-    from bs4 import BeautifulSoup, NavigableString
-    from urllib.parse import urljoin, quote
-    from pathlib import Path
+@_stage("parse")
+def parse_euronics_cards(html: str, label: str, dump: bool = True, mode: str | None = None) -> list[dict]:
+    base = "https://www.euronics.ee"
+    cards = select_cards(html, "euronics", mode)
+    print(f"Euronics({label}): kaarte DOM-is = {len(cards)}")
+    rows = []
 
+    for i, card in enumerate(cards, 1):
+        a = (
+            card.select_one("a.product-card__title[href]") or
+            card.select_one("h3 a[href]") or
+            max(
+                (x for x in card.select("a[href]") if (x.get_text(strip=True) or x.get("title"))),
+                key=lambda x: len((x.get("title") or x.get_text(strip=True) or "")),
+                default=None
+            )
+        )
+        name = (a.get("title") or a.get_text(" ", strip=True) or "").strip() if a else ""
+        href = a.get("href", "") if a else ""
+        link = urljoin(base, href) if href else ""
+        if not name:
+            img = card.select_one("img[alt]")
+            if img and img.get("alt"):
+                name = img["alt"].strip()
+
+        price = extract_euronics_price(card)
+
+        sale_price = ""
+        old_el = card.select_one(".price--old, .old-price")
+        if old_el:
+            old = clean_price(old_el.get_text(" ", strip=True))
+            try:
+                if old and price and float(old) > float(price):
+                    sale_price = price
+                    price = old
+            except:
+                pass
+
+        if link and price:
+            if not _card_ok(name):
+                continue
+            rows.append({
+                "name": name or "—",
+                "price": price,
+                "sale_price": sale_price,
+                "rating": "",
+                "store": "Euronics",
+                "url": link,
+            })
+
+        if dump and i <= 3:
+            DEBUG.dump(f"euro_card_{label}_{i}", card.prettify, store="euronics")
+
+    return rows
+
+# Hajutatud (hedged) režiimis küsime otsingulehte ja EURONICS_HEDGE_DELAY_S
+# hiljem (või kohe, kui otsing tuli tühjana) ka kategoorialehte; võidab esimene
+# ridadega vastus. Kaotaja lõim jääb taustale ja tema vastus läheb HTTP
+# vahemällu. Kogu asi mahub EURONICS_DEADLINE_S sisse. Vaikimisi väljas
+# (--euronics-hedge): see, kumb leht tulemuse annab, sõltub võrgu ajastusest, nii
+# et read võivad jooksude vahel vahelduda (lehe räsi ja ajasti näevad "muutust").
+EURONICS_HEDGE = False
+EURONICS_HEDGE_DELAY_S = 1.5
+EURONICS_DEADLINE_S = 30
+
+_EURONICS_LABELS = {"search": "otsinguleht", "category": "kategooria"}
+
+def _euronics_fetch(kind: str, url: str, headers: dict) -> list[dict] | None:
+    """Tõmba ja parsi üks leht; None, kui vastus polnud 200."""
+    r = http_get(url, headers=headers, timeout=20, store="euronics")
+    print(f"Euronics status: {r.status_code} ({kind})")
+    if r.status_code != 200:
+        return None
+    rows = parse_euronics_cards(r.text, kind)
+    DEBUG.dump(f"debug_euronics_{kind}", r.text, store="euronics", failure=not rows)
+    return rows
+
+def _euronics_hedged(sources: list[tuple[str, str]], headers: dict) -> tuple[str | None, list[dict]]:
+    job = _job_state()
+    done_q: queue.Queue = queue.Queue()
+
+    def worker(kind, url):
+        _set_job_state(job)              # lõimelokaalne – anname edasi
+        try:
+            done_q.put((kind, _euronics_fetch(kind, url, headers), None))
+        except Exception as e:
+            done_q.put((kind, None, e))
+
+    t0 = time.monotonic()
+    t_end = t0 + EURONICS_DEADLINE_S
+    waiting, running = list(sources), 0
+    hedge_at = t0
+
+    while waiting or running:
+        now = time.monotonic()
+        if waiting and (now >= hedge_at or not running):
+            kind, url = waiting.pop(0)
+            threading.Thread(target=worker, args=(kind, url),
+                             name=f"euronics-{kind}", daemon=True).start()
+            running += 1
+            hedge_at = now + EURONICS_HEDGE_DELAY_S
+            continue
+        wait_until = min(t_end, hedge_at) if waiting else t_end
+        if now >= t_end:
+            break
+        try:
+            kind, rows, err = done_q.get(timeout=max(0.0, wait_until - now))
+        except queue.Empty:
+            continue
+        running -= 1
+        if err is not None:
+            print(f"[Euronics WARN] {kind}: {err}")
+        elif rows:
+            if running:
+                print(f"Euronics: {kind} jõudis enne ({time.monotonic() - t0:.1f} s), teist ei oota")
+            return kind, rows
+        hedge_at = time.monotonic()      # tühi/vigane vastus – järgmine kohe
+    if running:
+        print(f"[WARN] Euronics: {EURONICS_DEADLINE_S} s tähtaeg täis")
+    return None, []
+
+def collect_euronics(query: str) -> list[dict]:
     base = "https://www.euronics.ee"
     search_url = f"{base}/otsing/{quote(query, safe='')}"
     category_url = f"{base}/meelelahutus/puldid-ja-roolid/puldid"
@@ -431,94 +1755,23 @@ def collect_euronics(query: str) -> list[dict]:
         "Connection": "keep-alive",
     }
 
-    def clean_price(txt: str) -> str:
-        if not txt:
-            return ""
-        t = txt.replace("\xa0", " ").replace("€", "").strip()
-        t = t.replace(",", ".")
-        m = re.findall(r"[0-9]+(?:\.[0-9]+)?", t)
-        return m[0] if m else ""
-
-    def parse_cards(html: str, label: str) -> list[dict]:
-        soup = BeautifulSoup(html, "lxml")
-        Path("out/debug_euronics.html").write_text(html, encoding="utf-8", errors="ignore")
-
-        cards = soup.select("article.product-card, div.product-card")
-        print(f"Euronics({label}): kaarte DOM-is = {len(cards)}")
-        rows = []
-
-        for i, card in enumerate(cards, 1):
-            a = (
-                card.select_one("a.product-card__title[href]") or
-                card.select_one("h3 a[href]") or
-                max(
-                    (x for x in card.select("a[href]") if (x.get_text(strip=True) or x.get("title"))),
-                    key=lambda x: len((x.get("title") or x.get_text(strip=True) or "")),
-                    default=None
-                )
-            )
-            name = (a.get("title") or a.get_text(" ", strip=True) or "").strip() if a else ""
-            href = a.get("href", "") if a else ""
-            link = urljoin(base, href) if href else ""
-            if not name:
-                img = card.select_one("img[alt]")
-                if img and img.get("alt"):
-                    name = img["alt"].strip()
-
-            pbox = card.select_one("div.price")
-            if pbox:
-              whole_node = next((t for t in pbox.children if isinstance(t, NavigableString)), "")
-              whole = (whole_node or "").strip()
-              frac = pbox.select_one("span.cp")
-              frac_txt = frac.get_text("", strip=True) if frac else ""
-              price_txt = f"{whole}{frac_txt}"
-            else:
-              price_txt = card.get_text(" ", strip=True)
-
-            price = extract_euronics_price(card)
-
-            sale_price = ""
-            old_el = card.select_one(".price--old, .old-price")
-            if old_el:
-                old = clean_price(old_el.get_text(" ", strip=True))
-                try:
-                    if old and price and float(old) > float(price):
-                        sale_price = price
-                        price = old
-                except:
-                    pass
-
-            if link and price:
-                if not _is_dualsense_white(name):
-                    continue
-                rows.append({
-                    "name": name or "—",
-                    "price": price,
-                    "sale_price": sale_price,
-                    "rating": "",
-                    "store": "Euronics",
-                    "url": link,
-                })
-
-            if i <= 3:
-                Path(f"out/euro_card_{label}_{i}.html").write_text(card.prettify(), encoding="utf-8")
-
+    if EURONICS_HEDGE:
+        kind, rows = _euronics_hedged([("search", search_url), ("category", category_url)], headers)
+        if kind:
+            print(f"Euronics: leidsin {len(rows)} rida ({_EURONICS_LABELS[kind]})")
+        else:
+            print(f"[WARN] Euronics: 0 rida – silumisarhiiv, jooks {DEBUG.run_id}")
         return rows
 
-    r = requests.get(search_url, headers=headers, timeout=20)
-    print(f"Euronics status: {r.status_code} (search)")
-    if r.status_code == 200:
-        rows = parse_cards(r.text, "search")
-        if rows:
-            print(f"Euronics: leidsin {len(rows)} rida (otsinguleht)")
-            return rows
-        else:
-            print("[WARN] kirjutasin out/debug_euronics.html (0 rida)")
+    rows = _euronics_fetch("search", search_url, headers)
+    if rows:
+        print(f"Euronics: leidsin {len(rows)} rida (otsinguleht)")
+        return rows
+    if rows is not None:
+        print(f"[WARN] Euronics otsinguleht: 0 rida – silumisarhiiv, jooks {DEBUG.run_id}")
 
-    r2 = requests.get(category_url, headers=headers, timeout=20)
-    print(f"Euronics status: {r2.status_code} (category)")
-    if r2.status_code == 200:
-        rows = parse_cards(r2.text, "category")
+    rows = _euronics_fetch("category", category_url, headers)
+    if rows is not None:
         print(f"Euronics: leidsin {len(rows)} rida (kategooria)")
         return rows
 
@@ -545,7 +1798,7 @@ def collect_euronics(query: str) -> list[dict]:
                 break
 
     for i, card in enumerate(parents[:3], 1):
-        Path(f"out/euro_fallback_{i}.html").write_text(card.prettify(), encoding="utf-8")
+        Path(f"{OUT_DIR}/euro_fallback_{i}.html").write_text(card.prettify(), encoding="utf-8")
 
     rows = []
     for card in parents:
@@ -607,7 +1860,7 @@ def collect_euronics(query: str) -> list[dict]:
                 break
 
     for i, card in enumerate(parents[:3], 1):
-        Path(f"out/euro_fallback_{i}.html").write_text(card.prettify(), encoding="utf-8")
+        Path(f"{OUT_DIR}/euro_fallback_{i}.html").write_text(card.prettify(), encoding="utf-8")
 
     rows = []
     for card in parents:
@@ -645,8 +1898,66 @@ def collect_euronics(query: str) -> list[dict]:
                 "url": link,
             })
 
-    print(f"Euronics: leidsin {len(rows)} rida (fallback)")
-    return rows
+    print(f"Euronics: leidsin {len(rows)} rida (fallback)")
+    return rows
+
+# Klevu annab tulemused asjakohasuse järjekorras. Küsime lehti lainetena
+# (KLICK_PAGE_WORKERS korraga) ja lõpetame, kui laines pole ühtki kirjet, mille
+# eelfilter (_card_ok) alles jätaks – edasi tuleb ainult veel vähem asjakohast.
+KLICK_PAGE_SIZE = 40
+KLICK_MAX_PAGES = 10
+KLICK_PAGE_WORKERS = 3
+
+def _klick_records(data: dict) -> tuple[list, int | None]:
+    """Klevu vastusest (kirjed, totalResultsFound); toetab mõlemat vastusekuju."""
+    records, meta = [], data.get("meta") or {}
+    res = data.get("result")
+    if isinstance(res, list) and res:
+        first = res[0]
+        if isinstance(first, dict) and "records" in first:
+            records = first.get("records", [])
+            meta = first.get("meta") or meta
+        else:
+            records = res
+    try:
+        total = int(meta.get("totalResultsFound"))
+    except (TypeError, ValueError):
+        total = None
+    return records, total
+
+def _klick_row(rec: dict) -> dict | None:
+    def to_float(s):
+        try:
+            return float(str(s).replace(",", "."))
+        except:
+            return None
+
+    name = (rec.get("name") or "").strip()
+    url = (rec.get("url") or "").strip()
+    sale_price = (rec.get("salePrice") or rec.get("price") or rec.get("basePrice") or "")
+    old_price = (rec.get("oldPrice") or "")
+
+    sp = to_float(sale_price)
+    op = to_float(old_price)
+
+    if op and sp and op > sp:
+        price = f"{op:.2f}"
+        discount = f"{sp:.2f}"
+    else:
+        price = f"{(sp or 0):.2f}" if sp is not None else ""
+        discount = ""
+
+    if not (name and url and price):
+        return None
+
+    return {
+        "name": name,
+        "price": price,
+        "sale_price": discount,
+        "rating": "",
+        "store": "Klick",
+        "url": url,
+    }
 
 def collect_klick(query: str) -> list[dict]:
 
@@ -661,13 +1972,11 @@ def collect_klick(query: str) -> list[dict]:
         "ipAddress": "undefined",
         "analyticsApiKey": API_KEY,
         "showOutOfStockProducts": "true",
-        "klevuFetchPopularTerms": "true",
-        "klevu_priceInterval": "500",
-        "fetchMinMaxPrice": "true",
-        "klevu_multiSelectFilters": "true",
-        "noOfResults": "40",
+        "klevuFetchPopularTerms": "false",   # populaarseid otsinguid ega
+        "fetchMinMaxPrice": "false",         # hinnavahemikke/filtreid me ei loe
+        "noOfResults": str(KLICK_PAGE_SIZE),
         "klevuSort": "rel",
-        "enableFilters": "true",
+        "enableFilters": "false",
         "filterResults": "",
         "visibility": "search",
         "category": "KLEVU_PRODUCT",
@@ -679,165 +1988,432 @@ def collect_klick(query: str) -> list[dict]:
         "Referer": "https://www.klick.ee/",
     }
 
-    try:
-        r = requests.get(API_BASE, params=params, headers=headers, timeout=20)
-        print(f"Klick status: {r.status_code}")
+    def fetch(start: int) -> tuple[list, int | None]:
+        r = http_get(API_BASE, params=dict(params, paginationStartsFrom=str(start)),
+                     headers=headers, timeout=20, store="klick")
         if r.status_code != 200:
-            return []
-        data = r.json()
-
-        records = []
-        res = data.get("result")
-        if isinstance(res, list) and res:
-            first = res[0]
-            if isinstance(first, dict) and "records" in first:
-                records = first.get("records", [])
-            else:
-                records = res
+            raise RuntimeError(f"HTTP {r.status_code} (algus {start})")
+        return _klick_records(r.json())
+
+    def fetch_wave(starts: list[int]) -> list:
+        out: list = [None] * len(starts)
+        job = _job_state()
 
-        rows = []
-        def to_float(s):
+        def one(i, start):
+            _set_job_state(job)
             try:
-                return float(str(s).replace(",", "."))
-            except:
-                return None
+                out[i] = fetch(start)
+            except Exception as e:
+                out[i] = e
+
+        threads = [threading.Thread(target=one, args=(i, st), name=f"klick-{st}", daemon=True)
+                   for i, st in enumerate(starts)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(25)
+        return out
+
+    rows, seen = [], set()
+
+    def take(records) -> bool:
+        """Lisa kirjed; True, kui mõni neist läbiks eelfiltri."""
+        METRICS.add("cards", len(records))
+        relevant = False
+        with METRICS.timed("parse"):
+            for rec in records:
+                row = _klick_row(rec)
+                if row is None:
+                    continue
+                relevant = relevant or _card_ok(row["name"], "klick")
+                key = _canon_url(row["url"])
+                if key not in seen:
+                    seen.add(key)
+                    rows.append(row)
+        return relevant
 
-        for rec in records:
-            name = (rec.get("name") or "").strip()
-            url = (rec.get("url") or "").strip()
-            sale_price = (rec.get("salePrice") or rec.get("price") or rec.get("basePrice") or "")
-            old_price = (rec.get("oldPrice") or "")
+    try:
+        records, total = fetch(0)
+    except Exception as e:
+        print(f"[Klick ERROR] {e}")
+        return []
 
-            sp = to_float(sale_price)
-            op = to_float(old_price)
+    pages = 1
+    relevant = take(records)
+    if total is None:
+        total = KLICK_PAGE_SIZE * KLICK_MAX_PAGES if len(records) >= KLICK_PAGE_SIZE else len(records)
+    last_page = min(KLICK_MAX_PAGES, -(-total // KLICK_PAGE_SIZE))
+    next_page = 1
+    while relevant and next_page < last_page:
+        wave = list(range(next_page, min(last_page, next_page + KLICK_PAGE_WORKERS)))
+        next_page = wave[-1] + 1
+        relevant, short = False, False
+        for page, res in zip(wave, fetch_wave([p * KLICK_PAGE_SIZE for p in wave])):
+            if res is None or isinstance(res, Exception):
+                print(f"[Klick WARN] leht {page + 1}: {res or 'aegus'}")
+                short = True
+                continue
+            pages += 1
+            records, _ = res
+            relevant = take(records) or relevant
+            short = short or len(records) < KLICK_PAGE_SIZE
+        if short:
+            break
 
-            if op and sp and op > sp:
-                price = f"{op:.2f}"       
-                discount = f"{sp:.2f}"     
-            else:
-                price = f"{(sp or 0):.2f}" if sp is not None else ""
-                discount = ""
+    print(f"Klick: leidsin {len(rows)} rida (API, {pages} lehte, kokku {total})")
+    return rows
 
-            if not (name and url and price):
-                continue
+def _print_route_stats(label: str, st: dict) -> None:
+    if not st:
+        return
+    METRICS.add("browser_requests_blocked", st["blocked"])
+    METRICS.add("browser_bytes_loaded", st["bytes_loaded"])
+    reasons = ", ".join(f"{k}={v}" for k, v in sorted(st["by_reason"].items()))
+    print(f"{label}: blokeerisin {st['blocked']} päringut ({reasons or '-'}), "
+          f"lubasin {st['allowed']}, laaditud ~{st['bytes_loaded'] / 1024:.0f} KiB")
 
-            rows.append({
-                "name": name,
-                "price": price,
-                "sale_price": discount,
-                "rating": "",
-                "store": "Klick",
-                "url": url,
-            })
+# ----------------------------------
+# REITINGUD (püsiv vahemälu)
+# ----------------------------------
 
-        print(f"Klick: leidsin {len(rows)} rida (API)")
-        return rows
+# Reitingud muutuvad päevade, mitte minutitega. Ridadele pannakse kohe vahemälust
+# teadaolev reiting; PDP-sid külastame ainult uute või aegunud URL-ide jaoks ja
+# poe kohta kuni FETCH_RATINGS_MAX_PER_STORE tükki (None = kõik, RATINGS_BUDGET_S piires).
+RATING_CACHE_PATH = "out/ratings.json"
+RATING_TTL_S = 3 * 86400
+RATING_EMPTY_TTL_S = 86400          # "reitingut pole" kontrollime uuesti päeva pärast
+RATING_FORGET_S = 30 * 86400        # nii kaua nägemata URL-id visatakse välja
 
-    except Exception as e:
-        print(f"[Klick ERROR] {e}")
-        return []
+class RatingCache:
+    """_canon_url -> {"rating": "4.5" | "", "fetched_at": unix-aeg}"""
 
-def collect_1a_pw(query: str) -> list[dict]:
-    rows: list[dict] = []
-    q = (STORE_DEFAULT_QUERIES.get("1a") if 'STORE_DEFAULT_QUERIES' in globals() else None) or query
-    search_url = f"https://www.1a.ee/otsing?q={quote(q, safe='')}"
-
-    with sync_playwright() as pw:
-        browser = pw.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent=UA,
-            locale="et-EE",
-            extra_http_headers={"Accept-Language": "et-EE,et;q=0.9,en-US;q=0.8,en;q=0.7"},
-            viewport={"width": 1366, "height": 900},
-        )
-        page = context.new_page()
-        page.goto(search_url, wait_until="networkidle", timeout=45000)
-        try:
-            page.wait_for_selector(".lupa-search-result-product-card, [data-cy='lupa-search-result-product-card']",
-                                   timeout=10000)
-        except Exception:
-            pass
-        html = page.content()
-        context.close(); browser.close()
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data: dict[str, dict] | None = None
 
-    Path("out/debug_1a_pw.html").write_text(html, encoding="utf-8")
-    soup = BeautifulSoup(html, "lxml")
-    cards = soup.select("div.lupa-search-result-product-card, [data-cy='lupa-search-result-product-card']")
-    print(f"1a(PW): leidsin {len(cards)} kaarti")
+    def _ensure(self) -> dict:
+        if self._data is None:
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
 
-    def looks_like_controller(name: str) -> bool:
-        n = (name or "").lower()
-        if any(x in n for x in ("laadimis", "dock", "charging", "charger", "station", "alus", "kaabel", "kaabl", "katte",
-                                 "kaitse", "kest", "silico", "siliko", "cradle", "alus", "holder")):
+    def get(self, url: str) -> dict | None:
+        with self._lock:
+            return self._ensure().get(_canon_url(url))
+
+    def is_fresh(self, entry: dict | None) -> bool:
+        if not entry:
             return False
-        return ("dualsense" in n) or ("kontroller" in n) or ("controller" in n)
+        ttl = RATING_TTL_S if entry.get("rating") else RATING_EMPTY_TTL_S
+        return time.time() - entry.get("fetched_at", 0) < ttl
 
-    def _extract_1a_name_link_prices(card) -> tuple[str, str, str, str]:
-        a = card.select_one("a[href]")
-        href = a.get("href", "") if a else ""
-        if href.startswith("/"):
-            href = "https://www.1a.ee" + href
+    def put(self, url: str, rating: str) -> None:
+        with self._lock:
+            self._ensure()[_canon_url(url)] = {"rating": rating or "", "fetched_at": time.time()}
 
-        name = (a.get_text(strip=True) if a else "") or ""
-        if not name:
-            img = card.select_one("img[alt]")
-            if img:
-                name = (img.get("alt") or "").strip()
+    def save(self) -> None:
+        with self._lock:
+            data = self._ensure()
+            cutoff = time.time() - RATING_FORGET_S
+            for k in [k for k, v in data.items() if v.get("fetched_at", 0) < cutoff]:
+                del data[k]
+            _atomic_write_text(self.path, json.dumps(data, ensure_ascii=False))
 
-        sale_txt = ""
-        price_txt = ""
+RATINGS = RatingCache(RATING_CACHE_PATH)
 
-        sale_el = (card.select_one("span.catalog-taxons-product-price__price-number") or
-                   card.select_one("[class*='price-number']") or
-                   card.select_one("[class*='price-current']"))
-        if sale_el:
-            sale_txt = sale_el.get_text(" ", strip=True)
+def enrich_ratings(rows: list[dict], label: str, fetch_ratings, budget: int | None = None) -> None:
+    """
+    Täida ridade `rating` vahemälust ja värskenda kuni `budget` URL-i.
+    fetch_ratings(urls) -> list[str | Exception] (sama järjekord).
+    """
+    if budget is None:
+        budget = FETCH_RATINGS_MAX_PER_STORE
 
-        old_el = (card.select_one("span.catalog-taxons-product-price__item-price") or
-                  card.select_one("[class*='old']") or
-                  card.select_one("del"))
-        if old_el:
-            price_txt = old_el.get_text(" ", strip=True)
+    new, stale = [], []
+    for r in rows:
+        if r.get("rating") or not r.get("url"):
+            continue
+        entry = RATINGS.get(r["url"])
+        if entry is None:
+            new.append(r)
+            continue
+        r["rating"] = entry.get("rating") or ""
+        if not RATINGS.is_fresh(entry):
+            stale.append((entry.get("fetched_at", 0), r))
+
+    # enne need, mida pole kunagi vaadatud, siis vanimad
+    stale.sort(key=lambda x: x[0])
+    todo = new + [r for _, r in stale]
+    if budget is not None:
+        todo = todo[:budget]
+    cached = sum(1 for r in rows if r.get("rating"))
+    METRICS.add("ratings_cached", cached)
+    METRICS.add("rating_fetches", len(todo))
+    if todo:
+        with METRICS.timed("ratings"):
+            try:
+                results = fetch_ratings([r["url"] for r in todo])
+            except Exception as e:     # read jäävad alles, reitingud vahemälust
+                results = [e] * len(todo)
+        errors = []
+        for r, rating in zip(todo, results):
+            if isinstance(rating, Exception):
+                errors.append(rating)
+                continue
+            RATINGS.put(r["url"], rating)
+            if rating:
+                r["rating"] = rating
+        RATINGS.save()
+        if errors:
+            print(f"[{label} rating WARN] {len(errors)}/{len(todo)} ebaõnnestus, nt: {errors[0]}")
+    print(f"{label}: reitinguid vahemälust {cached}, värskendasin {len(todo)} "
+          f"(ootel {max(0, len(new) + len(stale) - len(todo))})")
 
-        sale = clean_price(sale_txt)
-        price = clean_price(price_txt)
+# ----------------------------------
+# ASTMELINE LAADIMINE (HTTP → brauser)
+# ----------------------------------
 
-        if not sale or not price:
-            txt = card.get_text(" ", strip=True)
-            nums = re.findall(r"(\d+[\s.,]\d{2})\s*€", txt) or re.findall(r"(\d+[\s.,]\d{2})", txt)
+# 1a ja Kaup24 otsinguleht proovitakse esmalt tavalise GET-iga ja sama parseriga.
+# Brauserisse läheme, kui kaarte on alla TIER_MIN_CARDS või liiga suur osa
+# kaartidest jäi poolikuks (nimi/link/hind puudu). Kui HTTP ei piisa
+# TIER_HTTP_SKIP_AFTER korda järjest, jätame selle TIER_HTTP_RETRY_EVERY jooksuks vahele.
+TIERED_STORES = {"1a", "kaup24"}
+TIER_MIN_CARDS = {"1a": 1, "kaup24": 1}
+TIER_MAX_FAIL_RATIO = 0.25
+TIER_HTTP_SKIP_AFTER = 3
+TIER_HTTP_RETRY_EVERY = 10
+
+_TIER_MISSES: dict[str, int] = {}
+_TIER_SKIP: dict[str, int] = {}
+_TIER_LOCK = threading.Lock()
+
+def _tier_reset() -> None:
+    with _TIER_LOCK:
+        _TIER_MISSES.clear()
+        _TIER_SKIP.clear()
+
+def _http_tier_due(store: str) -> bool:
+    with _TIER_LOCK:
+        if _TIER_SKIP.get(store, 0) > 0:
+            _TIER_SKIP[store] -= 1
+            return False
+        return True
+
+def _http_tier_result(store: str, ok: bool) -> None:
+    with _TIER_LOCK:
+        if ok:
+            _TIER_MISSES[store] = 0
+            return
+        _TIER_MISSES[store] = _TIER_MISSES.get(store, 0) + 1
+        if _TIER_MISSES[store] >= TIER_HTTP_SKIP_AFTER:
+            _TIER_SKIP[store] = TIER_HTTP_RETRY_EVERY
+
+def _tier_enough(store: str, rows: list[dict], stats: dict) -> str:
+    """Tühi string = HTTP tulemus sobib; muidu põhjus."""
+    cards, fails = stats.get("cards", 0), stats.get("fails", 0)
+    if cards < TIER_MIN_CARDS.get(store, 1):
+        return f"{cards} kaarti"
+    if fails and fails / (len(rows) + fails) > TIER_MAX_FAIL_RATIO:
+        return f"{fails}/{len(rows) + fails} kaarti poolikud"
+    return ""
 
-            def tf(s: str):
-                try:
-                    return float(s.replace(" ", "").replace(",", "."))
-                except Exception:
-                    return None
-
-            vals = [tf(n) for n in nums if tf(n) is not None]
-            vals = sorted(set(vals))
-            if vals:
-                lo, hi = vals[0], vals[-1]
-                if len(vals) > 1 and hi > lo + 0.01:
-                    if not price:
-                        price = f"{hi:.2f}"
-                    if not sale:
-                        sale = f"{lo:.2f}"
-                else:
-                    if not price and not sale:
-                        price = f"{lo:.2f}"
+def fetch_listing(store: str, url: str, parse) -> tuple[list[dict], str, str]:
+    """
+    Otsinguleht astmeliselt. `parse(html, dump=..., stats=...)` on poe parser.
+    Tagastab (read, html, aste), aste = "http" | "browser".
+    """
+    if store in TIERED_STORES and _http_tier_due(store):
+        origin = "{0.scheme}://{0.netloc}/".format(urlsplit(url))
+        why = ""
+        try:
+            r = http_get(url, headers=dict(HDRS, Referer=origin), timeout=20, store=f"{store}_search")
+            if r.status_code != 200:
+                why = f"HTTP {r.status_code}"
+            else:
+                stats: dict = {}
+                rows = parse(r.text, dump=False, stats=stats)
+                why = _tier_enough(store, rows, stats)
+                if not why:
+                    _http_tier_result(store, True)
+                    METRICS.add("tier_http")
+                    print(f"[TIER] {store}: HTTP piisas ({stats['cards']} kaarti)")
+                    return rows, r.text, "http"
+        except Exception as e:
+            why = str(e) or type(e).__name__
+        _http_tier_result(store, False)
+        print(f"[TIER] {store}: HTTP ei piisa ({why}) – brauser")
+
+    html = BROWSER.page_html(url, store=store, kind="search")
+    METRICS.add("tier_browser")
+    return parse(html), html, "browser"
+
+# PDP reitingud: esmalt tavaline GET (ühine sessioon) ja _best_rating_from_html
+# toorel vastusel. Brauserisse lähevad ainult lehed, kus reitingumärgendit pole
+# üldse (ei JSON-LD aggregateRating-ut ega mikroandmeid) – siis joonistab selle JS.
+RATINGS_HTTP = True
+RATINGS_HTTP_WORKERS = 4
+
+def _has_rating_markup(html: str) -> bool:
+    """
+    Sama läbimine mis _best_rating_from_html: JSON-LD plokk aggregateRating-uga või
+    päris mikroandmed/.c-rating. Juhuslik "ratingValue" skriptis või JS-i kohatäide
+    ei loe – need lehed lähevad brauserisse, mitte vahemällu kui "".
+    """
+    for m in _RATING_SCAN_RE.finditer(html or ""):
+        if m.group("md") is not None or "aggregaterating" in m.group("ld").lower():
+            return True
+    return False
+
+def _http_ratings(urls: list[str], store: str, t_end: float) -> list:
+    """Iga URL-i kohta reiting (str), None (märgendit pole) või Exception."""
+    out: list = [None] * len(urls)
+    todo = queue.Queue()
+    for item in enumerate(urls):
+        todo.put(item)
+    origin = "{0.scheme}://{0.netloc}/".format(urlsplit(urls[0]))
+    headers = dict(HDRS, Referer=origin)
+    job = _job_state()
+
+    def worker():
+        _set_job_state(job)
+        while time.monotonic() < t_end:
+            try:
+                i, url = todo.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                r = http_get(url, headers=headers, timeout=min(FETCH_RATINGS_TIMEOUT_S, 20), cache=False)
+                if r.status_code != 200:
+                    continue
+                if _has_rating_markup(r.text):
+                    out[i] = _best_rating_from_html(r.text)
+            except Exception as e:
+                out[i] = e
+
+    threads = [threading.Thread(target=worker, name=f"pdp-{store}-{n}", daemon=True)
+               for n in range(min(RATINGS_HTTP_WORKERS, len(urls)))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(max(0.0, t_end - time.monotonic()))
+    return list(out)
+
+def _pdp_ratings(store: str):
+    """
+    enrich_ratings'i fetch_ratings: HTTP-GET, siis brauseri lehekogum neile,
+    kus reitingumärgendit polnud. Kõik ühe RATINGS_BUDGET_S sees.
+    """
+    def fetch_ratings(urls):
+        t0 = time.monotonic()
+        results: list = [None] * len(urls)
+        if RATINGS_HTTP:
+            with METRICS.timed("ratings_http"):
+                results = _http_ratings(urls, store, t0 + RATINGS_BUDGET_S)
+        hits = sum(1 for r in results if isinstance(r, str))
+        METRICS.add("rating_http_hits", hits)
+        METRICS.add("rating_http_misses", len(urls) - hits)
+
+        rest = [i for i, r in enumerate(results) if not isinstance(r, str)]
+        left = RATINGS_BUDGET_S - (time.monotonic() - t0)
+        if rest and left > 1:
+            try:
+                pages = BROWSER.pages_html([urls[i] for i in rest], store=store, kind="pdp",
+                                           timeout_s=FETCH_RATINGS_TIMEOUT_S,
+                                           pages=RATINGS_PAGES, budget_s=left)
+            except Exception as e:     # brauser katki – HTTP tulemused jäävad alles
+                pages = [e] * len(rest)
+            for i, h in zip(rest, pages):
+                results[i] = h if isinstance(h, Exception) else _best_rating_from_html(h)
+        elif rest:
+            for i in rest:
+                results[i] = TimeoutError(f"ajaeelarve {RATINGS_BUDGET_S} s täis")
+        if RATINGS_HTTP:
+            print(f"{store}: PDP reitingud HTTP-ga {hits}/{len(urls)}, brauseriga {len(rest) if left > 1 else 0}")
+        return results
+    return fetch_ratings
+
+def _looks_like_1a_controller(name: str) -> bool:
+    n = (name or "").lower()
+    if any(x in n for x in ("laadimis", "dock", "charging", "charger", "station", "alus", "kaabel", "kaabl", "katte",
+                             "kaitse", "kest", "silico", "siliko", "cradle", "alus", "holder")):
+        return False
+    return ("dualsense" in n) or ("kontroller" in n) or ("controller" in n)
+
+def _extract_1a_name_link_prices(card) -> tuple[str, str, str, str]:
+    a = card.select_one("a[href]")
+    href = a.get("href", "") if a else ""
+    if href.startswith("/"):
+        href = "https://www.1a.ee" + href
+
+    name = (a.get_text(strip=True) if a else "") or ""
+    if not name:
+        img = card.select_one("img[alt]")
+        if img:
+            name = (img.get("alt") or "").strip()
+
+    sale_txt = ""
+    price_txt = ""
+
+    sale_el = (card.select_one("span.catalog-taxons-product-price__price-number") or
+               card.select_one("[class*='price-number']") or
+               card.select_one("[class*='price-current']"))
+    if sale_el:
+        sale_txt = sale_el.get_text(" ", strip=True)
+
+    old_el = (card.select_one("span.catalog-taxons-product-price__item-price") or
+              card.select_one("[class*='old']") or
+              card.select_one("del"))
+    if old_el:
+        price_txt = old_el.get_text(" ", strip=True)
+
+    sale = clean_price(sale_txt)
+    price = clean_price(price_txt)
+
+    if not sale or not price:
+        txt = card.get_text(" ", strip=True)
+        nums = re.findall(r"(\d+[\s.,]\d{2})\s*€", txt) or re.findall(r"(\d+[\s.,]\d{2})", txt)
+
+        def tf(s: str):
+            try:
+                return float(s.replace(" ", "").replace(",", "."))
+            except Exception:
+                return None
+
+        vals = [tf(n) for n in nums if tf(n) is not None]
+        vals = sorted(set(vals))
+        if vals:
+            lo, hi = vals[0], vals[-1]
+            if len(vals) > 1 and hi > lo + 0.01:
+                if not price:
+                    price = f"{hi:.2f}"
+                if not sale:
+                    sale = f"{lo:.2f}"
+            else:
+                if not price and not sale:
+                    price = f"{lo:.2f}"
+
+    return name, href, price, sale
 
-        return name, href, price, sale
+@_stage("parse")
+def parse_1a_cards(html: str, dump: bool = True, mode: str | None = None,
+                   stats: dict | None = None) -> list[dict]:
+    cards = select_cards(html, "1a", mode)
+    print(f"1a(PW): leidsin {len(cards)} kaarti")
 
     fails = 0
     new_rows: list[dict] = []
     for card in cards:
         name, href, price, sale = _extract_1a_name_link_prices(card)
 
-        if not looks_like_controller(name):
+        if not _card_ok(name, "1a"):
             continue
 
         if not (name and href and (price or sale)):
-            if fails < 5:
-                Path(f"out/1a_fail_{fails+1}.html").write_text(card.prettify(), encoding="utf-8")
+            if dump and fails < 5:
+                DEBUG.dump(f"1a_fail_{fails+1}", card.prettify, store="1a", failure=True)
             fails += 1
             continue
 
@@ -864,107 +2440,74 @@ def collect_1a_pw(query: str) -> list[dict]:
         seen_urls.add(key)
         rows.append(r)
 
-    max_per = min(globals().get("FETCH_RATINGS_MAX_PER_STORE", 0) or 0, len(rows))
-    if max_per:
-        with sync_playwright() as pw2:
-            b2 = pw2.chromium.launch(headless=True)
-            c2 = b2.new_context(user_agent=UA, locale="et-EE",
-                                extra_http_headers={"Accept-Language": "et-EE,et;q=0.9,en-US;q=0.8,en;q=0.7"})
-            p2 = c2.new_page()
-            done = 0
-            for r in rows:
-                if r.get("rating"):
-                    continue
-                try:
-                    p2.goto(r["url"], wait_until="networkidle",
-                            timeout=(globals().get("FETCH_RATINGS_TIMEOUT_S", 25)) * 1000)
-                    p2.wait_for_timeout(1200)
-                    html_detail = p2.content()
-                    rating = _best_rating_from_html(html_detail)
-                    if rating:
-                        r["rating"] = rating
-                except Exception as e:
-                    print(f"[1a rating WARN] {e}")
-                done += 1
-                if done >= max_per:
-                    break
-            c2.close(); b2.close()
+    if stats is not None:
+        stats.update(cards=len(cards), fails=fails)
+    return rows
+
+def collect_1a_pw(query: str) -> list[dict]:
+    search_url = f"https://www.1a.ee/otsing?q={quote(query, safe='')}"
+
+    rows, html, tier = fetch_listing("1a", search_url, parse_1a_cards)
+    DEBUG.dump("debug_1a_pw", html, store="1a", failure=not rows)
 
-    print(f"1a(PW): leidsin {len(rows)} rida")
+    enrich_ratings(rows, "1a", _pdp_ratings("1a"))
+
+    _print_route_stats("1a(PW)", BROWSER.take_route_stats("1a"))
+    print(f"1a(PW): leidsin {len(rows)} rida ({tier})")
     if not rows:
-        print("[WARN] 1a(PW): 0 rida – vaata out/debug_1a_pw.html ja out/1a_fail_*.html")
+        print(f"[WARN] 1a(PW): 0 rida – vaata silumisarhiivi, jooks {DEBUG.run_id}")
     return rows
 
-def collect_kaup24_pw(query: str) -> list[dict]:
-    rows = []
-    q = (STORE_DEFAULT_QUERIES.get("Kaup24") if 'STORE_DEFAULT_QUERIES' in globals() else None) or query
-    search_url = f"https://www.kaup24.ee/et/sq?q={quote(q, safe='')}"
-
-    with sync_playwright() as pw:
-        browser = pw.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent=UA,
-            locale="et-EE",
-            extra_http_headers={"Accept-Language": "et-EE,et;q=0.9,en-US;q=0.8,en;q=0.7"},
-            viewport={"width": 1366, "height": 900},
-        )
-        page = context.new_page()
-        page.goto(search_url, wait_until="networkidle", timeout=45000)
-        try:
-            page.wait_for_selector("div.c-product-card, div.catalog-taxons-product-grid__item", timeout=10000)
-        except:
-            pass
-        html = page.content()
-        context.close(); browser.close()
+def _kaup24_name_and_link(card):
+    a = (card.select_one("a.c-product-card__name[href]") or
+         card.select_one("a[href*='/mangukonsoolid']") or
+         card.select_one("a[href^='/et/']") or
+         card.select_one("a[href]"))
+    if not a:
+        return "", ""
+    name = a.get_text(strip=True)
+    href = a.get("href", "")
+    if href and not href.startswith("http"):
+        href = "https://www.kaup24.ee" + href
+    return name, href
 
-    Path("out/debug_kaup24_pw.html").write_text(html, encoding="utf-8")
-    soup = BeautifulSoup(html, "lxml")
-    cards = soup.select("div.c-product-card, div.catalog-taxons-product-grid__item")
-    print(f"Kaup24(PW): leidsin {len(cards)} kaarti")
+def _kaup24_prices(card) -> tuple[str, str]:
+    meta = card.select_one('[itemprop="price"][content]')
+    if meta and meta.get("content"):
+        return clean_price(meta["content"]), ""
+
+    pbox = (card.select_one("div.c-price") or
+            card.select_one("span.c-price") or
+            card.select_one("span.h-price--medium") or
+            card.select_one("span.price") or
+            card)
+    txt = pbox.get_text(" ", strip=True) if pbox else ""
+    nums = re.findall(r"(\d+[\s.,]\d{2})\s*€", txt) or re.findall(r"\d+[\s.,]\d{2}", txt)
+    if not nums:
+        return "", ""
 
-    def extract_name_and_link(card):
-        a = (card.select_one("a.c-product-card__name[href]") or
-             card.select_one("a[href*='/mangukonsoolid']") or
-             card.select_one("a[href^='/et/']") or
-             card.select_one("a[href]"))
-        if not a:
-            return "", ""
-        name = a.get_text(strip=True)
-        href = a.get("href", "")
-        if href and not href.startswith("http"):
-            href = "https://www.kaup24.ee" + href
-        return name, href
+    def tf(s):
+        try:
+            return float(s.replace(" ", "").replace(",", "."))
+        except:
+            return None
 
-    def extract_prices(card) -> tuple[str, str]:
-        meta = card.select_one('[itemprop="price"][content]')
-        if meta and meta.get("content"):
-            return clean_price(meta["content"]), ""
-
-        pbox = (card.select_one("div.c-price") or
-                card.select_one("span.c-price") or
-                card.select_one("span.h-price--medium") or
-                card.select_one("span.price") or
-                card)
-        txt = pbox.get_text(" ", strip=True) if pbox else ""
-        nums = re.findall(r"(\d+[\s.,]\d{2})\s*€", txt) or re.findall(r"\d+[\s.,]\d{2}", txt)
-        if not nums:
-            return "", ""
-
-        def tf(s):
-            try:
-                return float(s.replace(" ", "").replace(",", "."))
-            except:
-                return None
+    if len(nums) >= 2:
+        a, b = tf(nums[0]), tf(nums[1])
+        if a is not None and b is not None and b < a:
+            return f"{a:.2f}", f"{b:.2f}"
 
-        if len(nums) >= 2:
-            a, b = tf(nums[0]), tf(nums[1])
-            if a is not None and b is not None and b < a:
-                return f"{a:.2f}", f"{b:.2f}"
+    a = tf(nums[0])
+    return (f"{a:.2f}" if a is not None else clean_price(nums[0])), ""
 
-        a = tf(nums[0])
-        return (f"{a:.2f}" if a is not None else clean_price(nums[0])), ""
+@_stage("parse")
+def parse_kaup24_cards(html: str, dump: bool = True, mode: str | None = None,
+                       stats: dict | None = None) -> list[dict]:
+    cards = select_cards(html, "kaup24", mode)
+    print(f"Kaup24(PW): leidsin {len(cards)} kaarti")
 
-        fails = 0
+    rows = []
+    fails = 0
     for i, card in enumerate(cards, start=1):
 
         j = _kaup24_widget_json(card)
@@ -978,12 +2521,9 @@ def collect_kaup24_pw(query: str) -> list[dict]:
             )
             price = _fmt_money(sell) if sell is not None else ""
 
-            if not _is_dualsense_white(name):
+            if not _card_ok(name):
                 continue
 
-            if not _is_dualsense_white(name):
-                continue
- 
             if name and url and price:
                 rows.append({
                     "name": name,
@@ -995,14 +2535,14 @@ def collect_kaup24_pw(query: str) -> list[dict]:
                 })
                 continue 
 
-        name, href = extract_name_and_link(card)
-        if not _is_dualsense_white(name):
+        name, href = _kaup24_name_and_link(card)
+        if not _card_ok(name):
             continue
 
-        price, sale = extract_prices(card)
+        price, sale = _kaup24_prices(card)
         if not (name and href and price):
-            if fails < 5:
-                Path(f"out/kaup24_fail_{fails+1}.html").write_text(card.prettify(), encoding="utf-8")
+            if dump and fails < 5:
+                DEBUG.dump(f"kaup24_fail_{fails+1}", card.prettify, store="kaup24", failure=True)
             fails += 1
             continue
 
@@ -1015,30 +2555,23 @@ def collect_kaup24_pw(query: str) -> list[dict]:
             "url": href,
         })
 
-    print(f"Kaup24(PW): leidsin {len(rows)} rida")
+    if stats is not None:
+        stats.update(cards=len(cards), fails=fails)
+    return rows
+
+def collect_kaup24_pw(query: str) -> list[dict]:
+    search_url = f"https://www.kaup24.ee/et/sq?q={quote(query, safe='')}"
+
+    rows, html, tier = fetch_listing("kaup24", search_url, parse_kaup24_cards)
+    DEBUG.dump("debug_kaup24_pw", html, store="kaup24", failure=not rows)
+
+    print(f"Kaup24(PW): leidsin {len(rows)} rida ({tier})")
     if not rows:
-        print("[WARN] Kaup24(PW): 0 rida – vaata out/debug_kaup24_pw.html ja out/kaup24_fail_*.html")
-
-    max_per = (globals().get("FETCH_RATINGS_MAX_PER_STORE", 0) or 0)
-    if max_per and rows:
-        with sync_playwright() as pw2:
-            browser2 = pw2.chromium.launch(headless=True)
-            context2 = browser2.new_context(
-                user_agent=UA, locale="et-EE",
-                viewport={"width": 1366, "height": 900}
-            )
-            page2 = context2.new_page()
-            for r in rows[:max_per]:
-                try:
-                    page2.goto(r["url"], wait_until="domcontentloaded",
-                               timeout=(globals().get("FETCH_RATINGS_TIMEOUT_S", 25)) * 1000)
-                    rating = _parse_rating_from_html(page2.content())
-                    if rating:
-                        r["rating"] = rating
-                except Exception as e:
-                    print(f"[Kaup24 rating WARN] {e}")
-            context2.close(); browser2.close()
+        print(f"[WARN] Kaup24(PW): 0 rida – vaata silumisarhiivi, jooks {DEBUG.run_id}")
 
+    enrich_ratings(rows, "Kaup24", _pdp_ratings("kaup24"))
+
+    _print_route_stats("Kaup24(PW)", BROWSER.take_route_stats("kaup24"))
     return rows
 
 def collect_kaup24(query: str) -> list[dict]:
@@ -1051,8 +2584,6 @@ def collect_1a(query: str) -> list[dict]:
 # KOONDAJA + MAIN
 # ----------------------------------
 
-import re
-
 def _normalize_for_match(s: str) -> str:
     """Normaliseeri: väiketähed, sünonüümid, ainult [a-z0-9 ] ja tühikute kokkutõmme."""
     s = (s or "").lower()
@@ -1068,39 +2599,427 @@ def _normalize_for_match(s: str) -> str:
     s = re.sub(r"\s+", " ", s).strip()
     return s
 
-WHITE_TOKENS = ("white", "valge", "pärlmutter", "pearl")
+# Poed koondamise järjekorras – selles järjekorras liidetakse ka read.
+COLLECTORS = {
+    "klick": collect_klick,
+    "euronics": collect_euronics,
+    "1a": collect_1a_pw,
+    "kaup24": collect_kaup24_pw,
+}
+STORE_NAMES = {"klick": "Klick", "euronics": "Euronics", "1a": "1a", "kaup24": "Kaup24"}   # ridade "store"
 
-NONWHITE_TOKENS_STRICT = (
-    "roheline", "green",
-    "sinine", "blue",
-    "punane", "red",
-    "hõbe", "hõbed", "silver",
-    "hall", "grey", "gray",
-    "camouflage", "kamuflaaž", "kamo",
-    "roosa", "pink",
-    "kuld", "gold",
-    "lilla", "purple"
-)
+STORES: tuple[str, ...] | None = None   # --stores; None = kõik COLLECTORS
 
-def _is_dualsense_white(name: str) -> bool:
-    n = (name or "").lower()
-    if not any(t in n for t in ("dualsense", "ps5", "playstation 5")):
-        return False
-    if not any(w in n for w in WHITE_TOKENS):
-        return False
-    if any(c in n for c in NONWHITE_TOKENS_STRICT):
-        return False
-    return True
+def active_stores() -> list[str]:
+    return [s for s in COLLECTORS if STORES is None or s in STORES]
 
-def collect_all(query: str) -> list[dict]:
-    all_rows = []
-    for fn in (collect_klick, collect_euronics, collect_1a_pw, collect_kaup24_pw):
+COLLECT_WORKERS = 4            # 1 = vana järjestikune režiim
+COLLECT_DEADLINE_S = 120       # vaikimisi tähtaeg ühe poe kohta
+STORE_DEADLINES_S = {
+    "klick": 30,
+    "euronics": 60,
+    "1a": 150,
+    "kaup24": 150,
+}
+
+def _store_deadline(store: str, override: float | None = None) -> float:
+    if override:
+        return float(override)
+    return float(STORE_DEADLINES_S.get(store, COLLECT_DEADLINE_S))
+
+def store_query(store: str, query: str, overrides: dict | None = None) -> str:
+    """Poe otsingufraas: jälgimisnimekirjas kirje enda oma, muidu STORE_DEFAULT_QUERIES."""
+    if overrides is not None:
+        return overrides.get(store) or query
+    return STORE_DEFAULT_QUERIES.get(store) or query
+
+def run_jobs(jobs: list[tuple], workers: int | None = None, deadline_s: float | None = None,
+             failed: dict | None = None) -> dict:
+    """
+    Käivita (pood, päring, eelfilter) tööd paralleelselt (kuni `workers` korraga).
+    Iga töö saab oma poe tähtaja; kui see ületatakse, on töö tulemus tühi.
+    Tagastab {töö: read}; `failed` täidetakse {töö: "viga" | "tähtaeg"}.
+    """
+    failed = {} if failed is None else failed
+    workers = COLLECT_WORKERS if workers is None else workers
+
+    def call(job):
+        store, query, prefilter = job
+        _set_job_state({"store": store, "prefilter": prefilter})
+        try:
+            with METRICS.timed("collect"):
+                rows = COLLECTORS[store](query) or []
+            METRICS.add("rows_raw", len(rows))
+            METRICS.add("rows_kept", 0)
+            return rows
+        finally:
+            _JOB.store = None        # järjestikrežiimis on see põhilõim
+
+    results: dict[tuple, list[dict]] = {}
+    if workers <= 1:
+        for job in jobs:
+            try:
+                results[job] = call(job)
+            except Exception as e:
+                print(f"[WARN] {COLLECTORS[job[0]].__name__} ebaõnnestus: {e}")
+                METRICS.add("errors", store=job[0])
+                failed[job] = "viga"
+                results[job] = []
+        return results
+
+    done_q: queue.Queue = queue.Queue()
+
+    def worker(job):
         try:
-            all_rows.extend(fn(query))
+            done_q.put((job, call(job), None))
         except Exception as e:
-            print(f"[WARN] {fn.__name__} ebaõnnestus: {e}")
+            done_q.put((job, [], e))
+
+    # Lõime ei saa tappa – rippuma jäänud pood jääb deemonlõimena taustale
+    # ega hoia kinni teisi ega protsessi lõppu.
+    waiting = list(jobs)
+    running: dict[tuple, float] = {}
+    while waiting or running:
+        while waiting and len(running) < workers:
+            job = waiting.pop(0)
+            running[job] = time.monotonic() + _store_deadline(job[0], deadline_s)
+            threading.Thread(target=worker, args=(job,),
+                             name=f"koguja-{job[0]}", daemon=True).start()
+
+        timeout = max(0.0, min(running.values()) - time.monotonic())
+        try:
+            job, rows, err = done_q.get(timeout=timeout)
+        except queue.Empty:
+            now = time.monotonic()
+            for job, t_end in list(running.items()):
+                if t_end <= now:
+                    print(f"[WARN] {COLLECTORS[job[0]].__name__}('{job[1]}') ületas tähtaja "
+                          f"({_store_deadline(job[0], deadline_s):.0f} s) – jätan vahele")
+                    METRICS.add("deadline_exceeded", store=job[0])
+                    failed[job] = "tähtaeg"
+                    del running[job]
+                    results[job] = []
+            continue
+
+        if job not in running:
+            continue
+        del running[job]
+        if err is not None:
+            print(f"[WARN] {COLLECTORS[job[0]].__name__} ebaõnnestus: {err}")
+            METRICS.add("errors", store=job[0])
+            failed[job] = "viga"
+        results[job] = rows
+    return results
+
+def query_jobs(query: str) -> list[tuple]:
+    return [(store, store_query(store, query), "dualsense_white") for store in active_stores()]
+
+def collect_all(query: str, workers: int | None = None, deadline_s: float | None = None) -> list[dict]:
+    """
+    Käivita poodide kogujad paralleelselt (kuni `workers` korraga).
+    Iga pood saab oma tähtaja; kui see ületatakse, jätkame ilma selle poe ridadeta.
+    Read liidetakse alati COLLECTORS järjekorras.
+    """
+    jobs = query_jobs(query)
+    results = run_jobs(jobs, workers=workers, deadline_s=deadline_s)
+    all_rows = []
+    for job in jobs:
+        all_rows.extend(results.get(job, []))
     return all_rows
 
+# ----------------------------------
+# JÄLGIMISNIMEKIRI
+# ----------------------------------
+
+WATCHLIST_PATH = "configs/watchlist.json"
+WATCHLIST_OUT_DIR = "out/watchlist"
+
+def _slug(s: str) -> str:
+    return re.sub(r"[^a-z0-9äöõü]+", "-", (s or "").lower()).strip("-") or "toode"
+
+def load_watchlist(path: str = WATCHLIST_PATH) -> list[dict]:
+    """
+    JSON: [{"name", "query", "store_queries"?, "stores"?, "prefilter"?, "filter"?}, ...]
+    või {"products": [...]}. Lihtsalt string tähendab {"query": string}.
+    """
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    entries = data.get("products", []) if isinstance(data, dict) else data
+    items, slugs = [], set()
+    for n, it in enumerate(entries, 1):
+        if isinstance(it, str):
+            it = {"query": it}
+        q = (it.get("query") or "").strip()
+        if not q:
+            raise ValueError(f"{path}: kirje {n} ilma 'query'-ta")
+        name = (it.get("name") or q).strip()
+        slug = _slug(name)
+        if slug in slugs:
+            raise ValueError(f"{path}: nimi '{name}' kordub")
+        slugs.add(slug)
+        stores = [s for s in (it.get("stores") or COLLECTORS) if s in COLLECTORS]
+        prefilter = it.get("prefilter") or "dualsense_white"
+        if prefilter not in PREFILTERS:
+            raise ValueError(f"{path}: '{name}' tundmatu prefilter '{prefilter}'")
+        f = it.get("filter") or {}
+        items.append({
+            "name": name,
+            "slug": slug,
+            "query": q,
+            "stores": stores,
+            "store_queries": it.get("store_queries") or {},
+            "prefilter": prefilter,
+            "classifier": RowClassifier(
+                q,
+                white_tokens=f.get("white_tokens"),
+                block_tokens=f.get("block_tokens"),
+                require=f.get("require") or ("dualsense",),
+                force_white=f.get("force_white"),
+            ),
+            "out_path": f"{WATCHLIST_OUT_DIR}/{slug}.html",
+        })
+    return items
+
+def collect_watchlist(items: list[dict], workers: int | None = None,
+                      deadline_s: float | None = None) -> dict[str, list[dict]]:
+    """
+    Kogu kõik kirjed korraga. Sama (pood, otsingufraas, eelfilter) tõmmatakse ühe
+    korra ja jagatakse; samaaegsus on piiratud kogu nimekirja peale.
+    Tagastab {slug: toored read}.
+    """
+    per_item, jobs = watchlist_jobs(items)
+    wanted = sum(len(k) for k in per_item.values())
+    print(f"[WATCHLIST] {len(items)} toodet, {wanted} poeotsingut → {len(jobs)} unikaalset")
+    results = run_jobs(jobs, workers=workers, deadline_s=deadline_s)
+    return split_watchlist(per_item, results)
+
+def watchlist_jobs(items: list[dict]) -> tuple[dict[str, list[tuple]], list[tuple]]:
+    """({slug: kirje tööd}, unikaalsed tööd järjekorras)."""
+    per_item: dict[str, list[tuple]] = {}
+    jobs: list[tuple] = []
+    for it in items:
+        keys = []
+        for store in it["stores"]:
+            if store not in active_stores():
+                continue
+            job = (store, store_query(store, it["query"], it["store_queries"]), it["prefilter"])
+            keys.append(job)
+            if job not in jobs:
+                jobs.append(job)
+        per_item[it["slug"]] = keys
+    return per_item, jobs
+
+def split_watchlist(per_item: dict[str, list[tuple]], results: dict) -> dict[str, list[dict]]:
+    """Tööde tulemused kirjete kaupa; iga kirje saab oma koopia ridadest."""
+    return {slug: [dict(r) for job in keys for r in results.get(job, [])]
+            for slug, keys in per_item.items()}
+
+# ----------------------------------
+# HINNAAJALUGU (SQLite)
+# ----------------------------------
+
+# Iga jooksu filtreeritud read lähevad ühe tehinguga out/history.sqlite3-sse
+# (WAL, nii et lugejad ei blokeeri kirjutajat). Võti on pood + kanoniline URL + aeg;
+# primaarvõti teenindab "viimane hind toote kohta" ja "toote ajavahemik" päringuid,
+# eraldi ts-indeks kogu ajaloo vahemikke ja kärpimist. price_queries seob punkti
+# kõigi päringute/jälgimisnimekirja kirjetega, mis selle toote samas jooksus hoidsid
+# (prices.query on ainult esimene) – sealt loeb --stores ülekanne.
+HISTORY = True
+HISTORY_PATH = "out/history.sqlite3"
+HISTORY_FULL_DAYS = 14      # nii kaua hoiame iga jooksu punkti
+HISTORY_KEEP_DAYS = 365     # vanemad read kustutatakse; vahepeal üks punkt päevas
+HISTORY_PRUNE_EVERY_S = 86400
+
+_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    store       TEXT    NOT NULL,
+    url         TEXT    NOT NULL,
+    ts          INTEGER NOT NULL,
+    name        TEXT,
+    price_cents INTEGER,
+    sale_cents  INTEGER,
+    rating      REAL,
+    query       TEXT,
+    run_id      TEXT,
+    PRIMARY KEY (store, url, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_ts ON prices (ts);
+CREATE INDEX IF NOT EXISTS prices_url_ts ON prices (url, ts);
+CREATE TABLE IF NOT EXISTS price_queries (
+    store TEXT    NOT NULL,
+    url   TEXT    NOT NULL,
+    ts    INTEGER NOT NULL,
+    query TEXT    NOT NULL,
+    PRIMARY KEY (store, query, ts, url)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def _cents(val) -> int | None:
+    s = _fmt_money(val)
+    return int(round(float(s) * 100)) if s else None
+
+def _rating_or_none(val) -> float | None:
+    try:
+        return float(str(val).replace(",", "."))
+    except ValueError:
+        return None
+
+class PriceHistory:
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_HISTORY_SCHEMA)
+            if db.execute("SELECT 1 FROM meta WHERE key = 'price_queries'").fetchone() is None:
+                with db:   # vanad andmebaasid: seni teadaolev päring prices.query-st
+                    db.execute("INSERT OR IGNORE INTO price_queries (store, url, ts, query)"
+                               " SELECT store, url, ts, query FROM prices WHERE query IS NOT NULL")
+                    db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('price_queries', '1')")
+            db.row_factory = sqlite3.Row
+            self._db = db
+        return self._db
+
+    def record(self, rows: list[dict], query: str = "", run_id: str = "",
+               ts: int | None = None) -> int:
+        """Lisa jooksu read; sama (pood, URL) samal ajahetkel läheb sisse üks kord."""
+        ts = int(ts if ts is not None else time.time())
+        batch, links = [], []
+        for r in rows:
+            url = _canon_url(r.get("url") or "")
+            if not url:
+                continue
+            store, q = (r.get("store") or "").strip(), r.get("query") or query
+            batch.append((
+                store, url, ts, _fmt_text(r.get("name")),
+                _cents(r.get("price")), _cents(r.get("sale_price")),
+                _rating_or_none(r.get("rating")), q, run_id,
+            ))
+            if q:
+                links.append((store, url, ts, q))
+        if not batch:
+            return 0
+        with self._lock:
+            db = self._conn()
+            with db:
+                cur = db.executemany(
+                    "INSERT OR IGNORE INTO prices (store, url, ts, name, price_cents, sale_cents,"
+                    " rating, query, run_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                added = cur.rowcount
+                db.executemany("INSERT OR IGNORE INTO price_queries (store, url, ts, query)"
+                               " VALUES (?, ?, ?, ?)", links)
+            self._maybe_prune(db)
+            return added
+
+    def latest(self, store: str | None = None) -> list[sqlite3.Row]:
+        """Iga toote viimane punkt."""
+        sql = ("SELECT p.* FROM prices p JOIN ("
+               " SELECT store, url, MAX(ts) AS ts FROM prices"
+               + (" WHERE store = ?" if store else "") +
+               " GROUP BY store, url) m USING (store, url, ts)"
+               " ORDER BY p.store, p.name")
+        with self._lock:
+            return self._conn().execute(sql, (store,) if store else ()).fetchall()
+
+    def series(self, url: str, store: str | None = None, since: float | None = None,
+               until: float | None = None) -> list[sqlite3.Row]:
+        """Ühe toote punktid ajavahemikus (URL kanoniseeritakse)."""
+        sql = "SELECT * FROM prices WHERE url = ? AND ts >= ? AND ts <= ?"
+        args = [_canon_url(url), int(since or 0), int(until if until is not None else 2**62)]
+        if store:
+            sql += " AND store = ?"
+            args.append(store)
+        with self._lock:
+            return self._conn().execute(sql + " ORDER BY ts", args).fetchall()
+
+    def last_run_rows(self, store: str, query: str) -> list[dict]:
+        """Poe read tema viimasest salvestatud jooksust selle päringuga (kujul nagu koguja annab)."""
+        with self._lock:
+            db = self._conn()
+            got = db.execute("SELECT MAX(ts) FROM price_queries WHERE store = ? AND query = ?",
+                             (store, query)).fetchone()
+            if not got or got[0] is None:
+                return []
+            recs = db.execute("SELECT p.* FROM price_queries q JOIN prices p USING (store, url, ts)"
+                              " WHERE q.store = ? AND q.query = ? AND q.ts = ?",
+                              (store, query, got[0])).fetchall()
+        return [{
+            "name": r["name"],
+            "price": f"{r['price_cents'] / 100:.2f}" if r["price_cents"] is not None else "",
+            "sale_price": f"{r['sale_cents'] / 100:.2f}" if r["sale_cents"] is not None else "",
+            "rating": f"{r['rating']:.1f}" if r["rating"] is not None else "",
+            "store": r["store"],
+            "url": r["url"],
+        } for r in recs]
+
+    def _maybe_prune(self, db: sqlite3.Connection, force: bool = False) -> None:
+        now = int(time.time())
+        last = db.execute("SELECT value FROM meta WHERE key = 'pruned_at'").fetchone()
+        if not force and last and now - int(last[0]) < HISTORY_PRUNE_EVERY_S:
+            return
+        full_cut = now - HISTORY_FULL_DAYS * 86400
+        keep_cut = now - HISTORY_KEEP_DAYS * 86400
+        with db:
+            db.execute("DELETE FROM prices WHERE ts < ?", (keep_cut,))
+            # vanemad kui HISTORY_FULL_DAYS: jäta alles päeva (UTC) viimane punkt
+            db.execute(
+                "DELETE FROM prices WHERE ts < :cut AND EXISTS ("
+                " SELECT 1 FROM prices n WHERE n.store = prices.store AND n.url = prices.url"
+                " AND n.ts > prices.ts AND n.ts < :cut AND n.ts / 86400 = prices.ts / 86400)",
+                {"cut": full_cut})
+            db.execute(
+                "DELETE FROM price_queries WHERE ts < :cut AND NOT EXISTS ("
+                " SELECT 1 FROM prices p WHERE p.store = price_queries.store"
+                " AND p.url = price_queries.url AND p.ts = price_queries.ts)",
+                {"cut": full_cut})
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pruned_at', ?)", (str(now),))
+
+    def prune(self) -> int:
+        """Harvenda kohe (mitte HISTORY_PRUNE_EVERY_S järgi); tagastab kustutatud ridade arvu."""
+        with self._lock:
+            db = self._conn()
+            before = db.total_changes
+            self._maybe_prune(db, force=True)
+            return db.total_changes - before - 1     # meta 'pruned_at' rida ei loe
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+PRICE_HISTORY = PriceHistory(HISTORY_PATH)
+atexit.register(PRICE_HISTORY.close)
+
+def record_history(rows: list[dict], query: str, run_id: str) -> None:
+    if not HISTORY:
+        return
+    try:
+        n = PRICE_HISTORY.record(rows, query=query, run_id=run_id)
+    except sqlite3.Error as e:
+        print(f"[HISTORY WARN] {e}")
+        return
+    print(f"[HISTORY] +{n} rida • {HISTORY_PATH}")
+
+def print_history(url: str | None = None) -> None:
+    rows = PRICE_HISTORY.series(url) if url else PRICE_HISTORY.latest()
+    if not rows:
+        print(f"Ajalugu puudub ({HISTORY_PATH}).")
+        return
+    tz = ZoneInfo("Europe/Tallinn")
+    for r in rows:
+        when = datetime.fromtimestamp(r["ts"], tz).strftime("%d.%m.%Y %H:%M")
+        price = f"{r['price_cents'] / 100:.2f}" if r["price_cents"] is not None else "-"
+        sale = f"{r['sale_cents'] / 100:.2f}" if r["sale_cents"] is not None else ""
+        tail = "" if url else f"  {r['name']}  {r['url']}"
+        print(f"{when}  {r['store']:<9} {price:>8} {sale:>8}{tail}")
+
 def parse_interval(s: str | int | float | None) -> int:
     """
     Lubab '900', '15m', '1h', '2.5m', '1d'. Tagastab sekundid (int).
@@ -1116,19 +3035,247 @@ def parse_interval(s: str | int | float | None) -> int:
     mult = {"s": 1, "m": 60, "h": 3600, "d": 86400}[unit]
     return int(val * mult)
 
-def run_once(override_query: str | None = None) -> dict:
+def _count_kept(rows: list[dict]) -> None:
+    for r in rows:
+        METRICS.add("rows_kept", store=(r.get("store") or "").lower() or None)
+
+def _finish_metrics() -> dict:
+    """Jooksu mõõdikud: [AEG] rida ja --prom-file korral textfile (seal ka iga jooksu ajatempel)."""
+    snap = METRICS.snapshot()
+    if PROM_FILE:
+        try:
+            write_prom_file(PROM_FILE, snap)
+        except OSError as e:
+            print(f"[WARN] {PROM_FILE}: {e}")
+    slow = sorted(((b["stages"]["collect"]["s"], st) for st, b in snap["stores"].items()
+                   if "collect" in b.get("stages", {})), reverse=True)
+    print(f"[AEG] kokku {snap['duration_s']:.1f} s • "
+          + ", ".join(f"{st} {t:.1f} s" for t, st in slow))
+    return snap
+
+def carried_rows(query: str, stores) -> list[dict]:
+    """
+    --stores alamhulga korral: vahele jäetud poodide read nende viimasest
+    jooksust ajaloos, et leht ei kaotaks neid poode.
+    """
+    if not (HISTORY and stores):
+        return []
+    rows = []
+    for st in stores:
+        try:
+            rows.extend(PRICE_HISTORY.last_run_rows(STORE_NAMES.get(st, st), query))
+        except sqlite3.Error as e:
+            print(f"[HISTORY WARN] {e}")
+    if rows:
+        print(f"[STORES] {len(rows)} rida ajaloost: {', '.join(stores)}")
+    return rows
+
+def _watchlist_carried(items: list[dict]) -> dict[str, list[dict]]:
+    active = active_stores()
+    return {it["slug"]: carried_rows(it["name"], [s for s in it["stores"] if s not in active])
+            for it in items}
+
+def run_once(override_query: str | None = None, workers: int | None = None,
+             deadline_s: float | None = None, watchlist: str | None = None) -> dict:
+    if NET_TAPE.mode:
+        _tier_reset()         # iga salvestatud/taasesitatud jooks läbib samad astmed
+    if watchlist:
+        return run_watchlist(watchlist, workers=workers, deadline_s=deadline_s)
+
     q = override_query or read_query()
-    print(f"[RUN] {datetime.now().isoformat()} • query='{q}'")
-    rows = collect_all(q)
+    METRICS.reset()
+    run_id = DEBUG.begin_run()
+    print(f"[RUN] {datetime.now().isoformat()} • query='{q}' • run={run_id}")
+    try:
+        rows = collect_all(q, workers=workers, deadline_s=deadline_s)
+    finally:
+        DEBUG.end_run()
+    skipped = [s for s in COLLECTORS if s not in active_stores()]
+    if not skipped:
+        return publish_query(q, rows, run_id)
+    return publish_query(q, rows + carried_rows(q, skipped), run_id, history_rows=rows)
+
+def publish_query(q: str, rows: list[dict], run_id: str, history_rows: list[dict] | None = None) -> dict:
+    """
+    Filtreeri, salvesta ajalukku, renderda; last_success.json ainult siis, kui leht muutus.
+    `history_rows` = ainult need toored read, mis tulid selles jooksus (vaikimisi kõik).
+    """
     before = len(rows)
-    rows = filter_rows(rows, q)
-    render_html(rows, query=q)
+    with METRICS.timed("filter"):
+        rows = filter_rows(rows, q)
+    _count_kept(rows)
+    with METRICS.timed("history"):
+        record_history(rows if history_rows is None else filter_rows(history_rows, q), q, run_id)
+    with METRICS.timed("render"):
+        changed = render_html(rows, query=q)
 
     human, iso = now_tallinn()
-    info = {"generated_at": iso, "query": q, "found_raw": before, "after_filter": len(rows)}
-    Path("out/last_success.json").write_text(json.dumps(info, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"[OK] {before} → {len(rows)} rida • out/tulemused.html")
-    return info
+    info = {"generated_at": iso, "run_id": run_id, "query": q, "found_raw": before,
+            "after_filter": len(rows)}
+    _write_last_success(info, changed)
+    print(f"[OK] {before} → {len(rows)} rida • {OUT_DIR}/tulemused.html"
+          + ("" if changed else " (muutusteta, ei kirjutanud üle)"))
+    return dict(info, changed=changed, metrics=_finish_metrics())
+
+def _write_last_success(info: dict, changed: bool) -> None:
+    """Jooksupõhised andmed (mõõdikud, kontrolli aeg) on --prom-file'is, mitte siin."""
+    path = Path(OUT_DIR) / "last_success.json"
+    if changed or not path.exists():
+        _atomic_write_text(path, json.dumps(info, ensure_ascii=False, indent=2))
+
+def run_watchlist(path: str, workers: int | None = None, deadline_s: float | None = None) -> dict:
+    items = load_watchlist(path)
+    METRICS.reset()
+    run_id = DEBUG.begin_run()
+    print(f"[RUN] {datetime.now().isoformat()} • watchlist='{path}' ({len(items)} toodet) • run={run_id}")
+    try:
+        raw = collect_watchlist(items, workers=workers, deadline_s=deadline_s)
+    finally:
+        DEBUG.end_run()
+    carried = _watchlist_carried(items)
+    if not any(carried.values()):
+        return publish_watchlist(path, items, raw, run_id)
+    full = {slug: rows + carried.get(slug, []) for slug, rows in raw.items()}
+    return publish_watchlist(path, items, full, run_id, history_raw=raw)
+
+def publish_watchlist(path: str, items: list[dict], raw: dict[str, list[dict]], run_id: str,
+                      history_raw: dict[str, list[dict]] | None = None) -> dict:
+    Path(WATCHLIST_OUT_DIR).mkdir(parents=True, exist_ok=True)
+    summary, kept = [], []
+    for it in items:
+        rows = raw.get(it["slug"], [])
+        before = len(rows)
+        with METRICS.timed("filter"):
+            rows = filter_rows(rows, it["query"], classifier=it["classifier"])
+            fresh = rows if history_raw is None else filter_rows(
+                history_raw.get(it["slug"], []), it["query"], classifier=it["classifier"])
+        _count_kept(rows)
+        kept.extend(dict(r, query=it["name"]) for r in fresh)
+        with METRICS.timed("render"):
+            changed = render_html(rows, out_path=it["out_path"], query=it["name"])
+        summary.append({"name": it["name"], "query": it["query"], "found_raw": before,
+                        "after_filter": len(rows), "out": it["out_path"], "changed": changed})
+        print(f"[OK] {it['name']}: {before} → {len(rows)} rida • {it['out_path']}"
+              + ("" if changed else " (muutusteta)"))
+
+    with METRICS.timed("history"):
+        record_history(kept, path, run_id)
+
+    human, iso = now_tallinn()
+    info = {"generated_at": iso, "run_id": run_id, "watchlist": path, "products": summary}
+    _write_last_success(info, any(p["changed"] for p in summary))
+    return dict(info, metrics=_finish_metrics())
+
+# ----------------------------------
+# KOHANDUV AJASTI (--every ... --adaptive)
+# ----------------------------------
+
+# Iga töö (pood + päring) elab oma intervalliga: muutus → tihedamini,
+# muutuseta → harvemini, viga → eksponentsiaalne ootus. Intervallid on poe
+# piirides (odav Klicki API võib käia tihti, brauseripoed harva) ja saavad
+# ±SCHED_JITTER juhuslikkust, et poed ei sünkroniseeruks. Pärast iga vooru
+# avaldatakse kõigi tööde viimased read; render_html jätab muutmata lehe puutumata.
+SCHED_BOUNDS_S = {            # pood -> (min, max) intervall sekundites
+    "klick": (120, 3600),
+    "euronics": (300, 3 * 3600),
+    "1a": (900, 6 * 3600),
+    "kaup24": (900, 6 * 3600),
+}
+SCHED_FASTER = 0.5            # muutuse korral intervall * see
+SCHED_SLOWER = 1.25           # muutuseta jooksu korral
+SCHED_JITTER = 0.1
+SCHED_MAX_FAILS = 3           # nii mitu viga järjest hoiame eelmisi ridu alles
+
+def _job_digest(rows: list[dict]) -> str:
+    keys = sorted((_canon_url(r.get("url") or ""), _fmt_money(r.get("price")),
+                   _fmt_money(r.get("sale_price"))) for r in rows)
+    return hashlib.sha256(json.dumps(keys).encode("utf-8")).hexdigest()
+
+class JobSchedule:
+    def __init__(self, job: tuple, base_s: float):
+        self.job = job
+        self.lo, self.hi = SCHED_BOUNDS_S.get(job[0], (60, 6 * 3600))
+        self.interval = min(self.hi, max(self.lo, base_s))
+        self.next_at = 0.0
+        self.rows: list[dict] = []
+        self.digest: str | None = None
+        self.fails = 0
+
+    def _plan(self, now: float, delay: float) -> None:
+        self.next_at = now + delay * random.uniform(1 - SCHED_JITTER, 1 + SCHED_JITTER)
+
+    def update(self, rows: list[dict], failed: bool, now: float) -> bool:
+        """Võta vastu jooksu tulemus ja planeeri järgmine; True, kui read muutusid."""
+        if failed:
+            self.fails += 1
+            self._plan(now, min(self.hi, self.interval * 2 ** self.fails))
+            if self.fails < SCHED_MAX_FAILS:
+                return False
+        else:
+            self.fails = 0
+        digest = _job_digest(rows)
+        changed = digest != self.digest
+        if not failed:
+            if self.digest is not None:
+                k = SCHED_FASTER if changed else SCHED_SLOWER
+                self.interval = min(self.hi, max(self.lo, self.interval * k))
+            self._plan(now, self.interval)
+        self.rows, self.digest = rows, digest
+        return changed
+
+def run_adaptive(base_s: float, query: str | None = None, watchlist: str | None = None,
+                 workers: int | None = None, deadline_s: float | None = None) -> None:
+    if watchlist:
+        items = load_watchlist(watchlist)
+        per_item, jobs = watchlist_jobs(items)
+        carried = _watchlist_carried(items)
+    else:
+        q = query or read_query()
+        jobs = query_jobs(q)
+        carried = carried_rows(q, [s for s in COLLECTORS if s not in active_stores()])
+    scheds = {job: JobSchedule(job, base_s) for job in jobs}
+    print(f"[SCHED] {len(jobs)} tööd, baasintervall {base_s:.0f} s. Lõpetamiseks Ctrl+C.")
+
+    while True:
+        now = time.monotonic()
+        due = [job for job, sc in scheds.items() if sc.next_at <= now]
+        if not due:
+            time.sleep(max(0.5, min(sc.next_at for sc in scheds.values()) - now))
+            continue
+
+        METRICS.reset()
+        run_id = DEBUG.begin_run()
+        print(f"[RUN] {datetime.now().isoformat()} • {', '.join(f'{j[0]}:{j[1]!r}' for j in due)} • run={run_id}")
+        errors: dict[tuple, str] = {}
+        try:
+            results = run_jobs(due, workers=workers, deadline_s=deadline_s, failed=errors)
+        finally:
+            DEBUG.end_run()
+
+        now = time.monotonic()
+        for job in due:
+            sc, rows = scheds[job], results.get(job, [])
+            # ainult selle töö viga – sama poe teine päring ei tohi seda aeglustada
+            failed = job in errors or (not rows and bool(sc.rows))
+            changed = sc.update(rows, failed, now)
+            state = "VIGA" if failed else ("muutus" if changed else "sama")
+            print(f"[SCHED] {job[0]}:{job[1]!r} {state} • järgmine {sc.next_at - now:.0f} s pärast "
+                  f"(intervall {sc.interval:.0f} s)")
+
+        latest = {job: sc.rows for job, sc in scheds.items()}
+        fresh = {job: latest[job] for job in due}
+        try:
+            if watchlist:
+                rows = split_watchlist(per_item, latest)
+                publish_watchlist(watchlist, items,
+                                  {slug: rs + carried.get(slug, []) for slug, rs in rows.items()},
+                                  run_id, history_raw=split_watchlist(per_item, fresh))
+            else:
+                publish_query(q, [r for job in jobs for r in latest[job]] + carried, run_id,
+                              history_rows=[r for job in jobs if job in fresh for r in fresh[job]])
+        except Exception:
+            print("[ERROR] Avaldamine ebaõnnestus – detailid all:", file=sys.stderr)
+            traceback.print_exc()
 
 def parse_interval(s: str | int | float | None) -> int:
     if s is None:
@@ -1146,25 +3293,131 @@ def main():
     parser = argparse.ArgumentParser(description="Hinnad – koondkoguja")
     parser.add_argument("--every", help="Käivita perioodiliselt (nt '15m', '900', '1h'). Vaikimisi üks kord.")
     parser.add_argument("--query", help="Kirjuta üle configs/default.txt päringuga.")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Koos --every-ga: iga pood/päring oma kohanduva intervalliga (--every = algväärtus).")
+    parser.add_argument("--stores",
+                        help=f"Komadega poodide alamhulk (valikud: {','.join(COLLECTORS)}). "
+                             "Ülejäänud poodide read võetakse nende viimasest jooksust ajaloos.")
+    parser.add_argument("--workers", type=int,
+                        help=f"Mitu poodi korraga (vaikimisi {COLLECT_WORKERS}; 1 = järjestikku).")
+    parser.add_argument("--deadline", type=float,
+                        help="Ühe poe tähtaeg sekundites (vaikimisi STORE_DEADLINES_S).")
+    parser.add_argument("--watchlist", nargs="?", const=WATCHLIST_PATH,
+                        help=f"Jälgi mitut toodet korraga (vaikimisi {WATCHLIST_PATH}).")
+    parser.add_argument("--euronics-hedge", action="store_true",
+                        help=f"Euronics: küsi {EURONICS_HEDGE_DELAY_S} s pärast ka kategoorialehte, "
+                             "võidab esimene ridadega vastus (kiirem, aga tulemus sõltub ajastusest).")
+    parser.add_argument("--no-http-cache", action="store_true",
+                        help="Ära kasuta out/http_cache kettavahemälu.")
+    parser.add_argument("--debug-artifacts", choices=("off", "sampled", "full"),
+                        help=f"Lehtede/kaartide salvestamine {DEBUG_DIR} alla (vaikimisi {DEBUG_ARTIFACTS}).")
+    parser.add_argument("--artifacts", metavar="RUN_ID",
+                        help="Näita jooksu silumisfaile ('last' = viimane) ja välju.")
+    parser.add_argument("--prom-file", metavar="PATH",
+                        help="Kirjuta jooksu mõõdikud Prometheuse textfile-collectori faili.")
+    parser.add_argument("--no-history", action="store_true",
+                        help=f"Ära salvesta hindu {HISTORY_PATH} ajalukku.")
+    parser.add_argument("--history", nargs="?", const="", metavar="URL",
+                        help="Näita iga toote viimast hinda (või ühe URL-i ajalugu) ja välju.")
+    parser.add_argument("--prune-history", action="store_true",
+                        help=f"Harvenda ajalugu kohe ({HISTORY_FULL_DAYS} p kõik punktid, kuni "
+                             f"{HISTORY_KEEP_DAYS} p üks päevas) ja välju.")
+    parser.add_argument("--record", metavar="DIR",
+                        help="Salvesta kõik HTTP ja brauseri vastused kausta (hiljem --replay jaoks).")
+    parser.add_argument("--replay", metavar="DIR",
+                        help="Serveeri vastused --record kaustast, võrku ei kasutata. "
+                             "Väljundid ja olek lähevad DIR/replay-state alla (out/ jääb puutumata).")
+    parser.add_argument("--replay-latency", metavar="S|rec",
+                        help="Koos --replay-ga: lisaviide igale vastusele sekundites "
+                             "või 'rec' = salvestamisel mõõdetud aeg.")
     args = parser.parse_args()
 
+    global HTTP_CACHE, HISTORY, PROM_FILE, STORES, EURONICS_HEDGE
+    if args.stores:
+        STORES = tuple(st.strip().lower() for st in args.stores.split(",") if st.strip())
+        unknown = [st for st in STORES if st not in COLLECTORS]
+        if unknown:
+            parser.error(f"tundmatu pood: {', '.join(unknown)} (valikud: {', '.join(COLLECTORS)})")
+    PROM_FILE = args.prom_file or PROM_FILE
+    if args.no_http_cache:
+        HTTP_CACHE = False
+    if args.euronics_hedge:
+        EURONICS_HEDGE = True
+    if args.no_history:
+        HISTORY = False
+    if args.debug_artifacts:
+        DEBUG.level = args.debug_artifacts
+    if args.record and args.replay:
+        parser.error("--record ja --replay ei käi koos")
+    if args.replay_latency and not args.replay:
+        parser.error("--replay-latency vajab --replay-d")
+    if args.record or args.replay:
+        latency = args.replay_latency
+        if latency and latency != "rec":
+            try:
+                latency = float(latency)
+            except ValueError:
+                parser.error("--replay-latency: sekundid või 'rec'")
+        # vahemälud vahelt ära: salvestus tahab päris vastuseid ja aegu; ülejäänud
+        # out/ olek ja väljundid lähevad lindi kausta (vt _tape_state)
+        HTTP_CACHE = False
+        NET_TAPE.start("record" if args.record else "replay", args.record or args.replay, latency)
+        _tape_state()
+        print(f"[{NET_TAPE.mode.upper()}] {NET_TAPE.root}")
+
+    if args.artifacts:
+        arts = DEBUG.artifacts_for(args.artifacts)
+        if not arts:
+            print(f"Jooksu '{args.artifacts}' silumisfaile ei leitud ({DEBUG_DIR}/runs).")
+        for a in arts:
+            print(f"{a['store'] or '-':<9} {a['label']:<28} {a['bytes'] / 1024:>8.0f} KiB  {DEBUG_DIR}/{a['path']}")
+        return
+
+    if args.history is not None:
+        print_history(args.history or None)
+        return
+
+    if args.prune_history:
+        try:
+            n = PRICE_HISTORY.prune()
+        except sqlite3.Error as e:
+            print(f"[HISTORY WARN] {e}")
+            return
+        print(f"[HISTORY] harvendatud: -{n} rida • {HISTORY_PATH}")
+        return
+
     interval = parse_interval(args.every) if args.every else 0
 
     if not interval:
-        run_once(args.query)
+        run_once(args.query, workers=args.workers, deadline_s=args.deadline,
+                 watchlist=args.watchlist)
+        return
+
+    if args.adaptive:
+        try:
+            run_adaptive(interval, query=args.query, watchlist=args.watchlist,
+                         workers=args.workers, deadline_s=args.deadline)
+        except KeyboardInterrupt:
+            print("\n[DAEMON] Katkestatud kasutaja poolt.")
         return
 
     print(f"[DAEMON] Käivitan iga {interval} sekundi järel. Lõpetamiseks Ctrl+C.")
     while True:
         t0 = time.time()
         try:
-            run_once(args.query)
+            run_once(args.query, workers=args.workers, deadline_s=args.deadline,
+                     watchlist=args.watchlist)
         except KeyboardInterrupt:
             print("\n[DAEMON] Katkestatud kasutaja poolt.")
             break
         except Exception:
             print("[ERROR] Jooks ebaõnnestus – detailid all:", file=sys.stderr)
             traceback.print_exc()
+            if PROM_FILE:
+                try:
+                    write_prom_file(PROM_FILE, METRICS.snapshot(), ok=False)
+                except OSError as e:
+                    print(f"[WARN] {PROM_FILE}: {e}")
         dt = time.time() - t0
         sleep_s = max(0, interval - dt)
         if sleep_s: